@@ -0,0 +1,749 @@
+import os
+import time
+import uuid
+import zlib
+import pickle
+import random
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+# How a row's value is stored
+INTEGER, PICKLED, COMPRESSED = 0, 1, 2
+
+SCHEMA = [
+    'PRAGMA auto_vacuum = INCREMENTAL',
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY, kind INTEGER NOT NULL, value BLOB NOT NULL,'
+    ' size INTEGER NOT NULL, expires REAL, accessed REAL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+]
+
+class SQLiteCache(BaseCache):
+    """
+    Cache backend storing entries in a single SQLite database file in WAL
+    mode, shared by every process on the machine. Keys and expiry times are
+    indexed so expired entries are never loaded, values are pickled and
+    compressed above COMPRESS_MIN bytes, and every write is a single atomic
+    statement or transaction. Integers are stored as SQL integers so incr()
+    is atomic across processes. Needs SQLite 3.35 or later for RETURNING.
+
+    The database is kept under MAX_SIZE bytes by sweep(), which runs on a
+    background thread every SWEEP_FREQUENCY writes on average, so it never
+    delays the request making the write, and from the sweep_cache command.
+    It deletes expired entries, then the least recently read ones, and
+    returns the freed pages to the file system. Reads are not writes: each
+    process collects the times its entries were read and records them from
+    a background thread at most every ACCESS_INTERVAL seconds.
+
+    Options:
+        MAX_SIZE (int): Largest total size of stored values in bytes
+        COMPRESS_MIN (int): Smallest pickled size that is compressed
+        SWEEP_FREQUENCY (int): Average number of writes between sweeps
+        ACCESS_INTERVAL (float): Seconds between recordings of read times
+        BUSY_TIMEOUT (float): Seconds to wait for another writer
+    """
+
+    def __init__(self, location, params):
+        super(SQLiteCache, self).__init__(params)
+        if sqlite3.sqlite_version_info < (3, 35, 0):
+            raise ImproperlyConfigured(
+                'core.cache.SQLiteCache needs SQLite 3.35 or later, found %s'
+                % sqlite3.sqlite_version
+            )
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self.compress_min = int(options.get('COMPRESS_MIN', 1024))
+        self.sweep_frequency = int(options.get('SWEEP_FREQUENCY', 1000))
+        self.access_interval = float(options.get('ACCESS_INTERVAL', 10))
+        self.busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self.local = threading.local()
+        self.sweeping = threading.Lock()
+
+        # Time each key was last read since read times were last recorded
+        self.accesses = {}
+        self.accesses_lock = threading.Lock()
+        self.recorded = time.monotonic()
+
+    @property
+    def connection(self):
+        """
+        Get the current thread's connection, creating the database on first
+        use
+
+        Returns:
+            Connection: SQLite connection in autocommit mode
+        """
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None
+            )
+            for statement in SCHEMA:
+                connection.execute(statement)
+            columns = [row[1] for row in connection.execute('PRAGMA table_info(cache)')]
+            if 'accessed' not in columns:
+                # Databases created before read times were recorded
+                connection.execute('ALTER TABLE cache ADD COLUMN accessed REAL')
+            self.local.connection = connection
+        return connection
+
+    def encode(self, value):
+        """
+        Returns:
+            (int, object): Storage kind and stored value
+        """
+        if type(value) is int:
+            return INTEGER, value
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) >= self.compress_min:
+            return COMPRESSED, zlib.compress(data, 1)
+        return PICKLED, data
+
+    def decode(self, kind, value):
+        if kind == INTEGER:
+            return value
+        if kind == COMPRESSED:
+            value = zlib.decompress(value)
+        return pickle.loads(value)
+
+    def row(self, key, value, timeout, version):
+        kind, stored = self.encode(value)
+        size = len(stored) if kind != INTEGER else 8
+        key = self.make_and_validate_key(key, version=version)
+        expires = self.get_backend_timeout(timeout)
+        return key, kind, stored, size, expires, time.time()
+
+    def written(self):
+        """
+        Sweep the database in the background on average every
+        SWEEP_FREQUENCY writes
+        """
+        self.maintain(
+            bool(self.sweep_frequency) and random.randrange(self.sweep_frequency) == 0
+        )
+
+    def read(self, keys):
+        """
+        Collect the read time of keys, recorded in the background once
+        ACCESS_INTERVAL seconds passed since read times were last recorded
+        """
+        now = time.time()
+        with self.accesses_lock:
+            for key in keys:
+                self.accesses[key] = now
+        self.maintain(False)
+
+    def maintain(self, sweep):
+        """
+        Record the collected read times when due, or sweep the database when
+        asked, on a background thread unless this instance is already doing
+        either
+        """
+        record = (
+            self.accesses and
+            time.monotonic() - self.recorded >= self.access_interval
+        )
+        if (sweep or record) and self.sweeping.acquire(blocking=False):
+            threading.Thread(
+                target=self.maintain_in_background, args=(sweep,),
+                name='cache-sweep', daemon=True
+            ).start()
+
+    def maintain_in_background(self, sweep):
+        try:
+            if sweep:
+                self.sweep()
+            else:
+                self.record_accesses()
+        except sqlite3.Error as error:
+            logger.warning('Sweeping cache %s failed: %s', self.path, error)
+        finally:
+            # The thread ends here, so its connection is not kept
+            connection = getattr(self.local, 'connection', None)
+            if connection is not None:
+                connection.close()
+                del self.local.connection
+            self.sweeping.release()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        row = self.row(key, value, timeout, version)
+        cursor = self.connection.execute(
+            'INSERT INTO cache (key, kind, value, size, expires, accessed) '
+            'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+            'kind = excluded.kind, value = excluded.value, '
+            'size = excluded.size, expires = excluded.expires, '
+            'accessed = excluded.accessed WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            row + (time.time(),)
+        )
+        self.written()
+        return cursor.rowcount == 1
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self.connection.execute(
+            'SELECT kind, value FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone()
+        if row is None:
+            return default
+        self.read([key])
+        return self.decode(*row)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO cache (key, kind, value, size, expires, accessed) '
+            'VALUES (?, ?, ?, ?, ?, ?)', self.row(key, value, timeout, version)
+        )
+        self.written()
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self.connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time())
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self.connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.connection.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time())
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        rows = self.connection.execute(
+            'UPDATE cache SET value = value + ?, accessed = ? WHERE key = ? '
+            'AND kind = ? AND (expires IS NULL OR expires > ?) RETURNING value',
+            (delta, time.time(), key, INTEGER, time.time())
+        ).fetchall()
+        if not rows:
+            raise ValueError("Key '%s' not found" % key)
+        return rows[0][0]
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not keys:
+            return {}
+        rows = self.connection.execute(
+            'SELECT key, kind, value FROM cache WHERE key IN (%s) '
+            'AND (expires IS NULL OR expires > ?)' % ','.join('?' * len(keys)),
+            list(keys) + [time.time()]
+        ).fetchall()
+        self.read([key for key, kind, value in rows])
+        return {keys[key]: self.decode(kind, value) for key, kind, value in rows}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        rows = [self.row(key, value, timeout, version) for key, value in data.items()]
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, kind, value, size, expires, accessed) '
+                'VALUES (?, ?, ?, ?, ?, ?)', rows
+            )
+        self.written()
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self.connection.execute(
+                'DELETE FROM cache WHERE key IN (%s)' % ','.join('?' * len(keys)),
+                keys
+            )
+
+    def clear(self):
+        self.connection.execute('DELETE FROM cache')
+
+    def record_accesses(self):
+        """
+        Record the collected read times of entries in the database
+        """
+        with self.accesses_lock:
+            accesses, self.accesses = self.accesses, {}
+            self.recorded = time.monotonic()
+        if accesses:
+            with self.connection:
+                self.connection.execute('BEGIN IMMEDIATE')
+                self.connection.executemany(
+                    'UPDATE cache SET accessed = MAX(COALESCE(accessed, 0), ?) '
+                    'WHERE key = ?',
+                    [(accessed, key) for key, accessed in accesses.items()]
+                )
+
+    def sweep(self):
+        """
+        Delete expired entries, then the least recently read entries until
+        the stored values fit in MAX_SIZE, and release the freed pages.
+        Copies only read while the source of an entry fails are evicted
+        before the entries read by requests.
+
+        Returns:
+            (int, int): Number of deleted entries and remaining size in bytes
+        """
+        self.record_accesses()
+        connection = self.connection
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            deleted = connection.execute(
+                'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+            ).rowcount
+            size = connection.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM cache'
+            ).fetchone()[0]
+            if size > self.max_size:
+                # Entries that never expire are evicted last
+                excess = size - self.max_size
+                rows = connection.execute(
+                    'SELECT key, size FROM cache ORDER BY expires IS NULL, accessed'
+                ).fetchall()
+                keys = []
+                for key, row_size in rows:
+                    keys.append((key,))
+                    excess -= row_size
+                    size -= row_size
+                    if excess <= 0:
+                        break
+                connection.executemany('DELETE FROM cache WHERE key = ?', keys)
+                deleted += len(keys)
+        # Run through executescript, which steps the pragma until every free
+        # page is released rather than one page per step
+        connection.executescript('PRAGMA incremental_vacuum;')
+        connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return deleted, size
+
+    def close(self, **kwargs):
+        # Connections are kept open per thread for the life of the process
+        pass
+
+class TieredCache(BaseCache):
+    """
+    Two-tier cache backend: a bounded in-process LRU (L1) in front of a
+    shared cache alias (L2), usually a networked backend such as Redis or
+    memcached so every machine shares one copy of each entry.
+
+    Entries under LOCAL_PREFIXES are also kept in L1, pickled so callers
+    never share objects. Every write gives them a new stamp stored in L2
+    next to the value, and L1 copies older than LOCAL_TTL seconds are only
+    used again once their stamp is found current. Writes and deletes made
+    by other processes are seen within LOCAL_TTL seconds, and unchanged
+    values are not transferred again. Other keys, such as locks, are read
+    and written in L2 only.
+
+    When L2 fails, every key is kept in L1 alone for RETRY_AFTER seconds.
+    L1 copies are then served whatever their stamp, and locks only exclude
+    callers within the process.
+
+    Options:
+        SHARED (string): Alias of the L2 cache
+        MAX_SIZE (int): Largest total size of pickled values kept in L1
+        LOCAL_TTL (float): Seconds an L1 copy is used without checking L2
+        LOCAL_PREFIXES ([string]): Prefixes of the keys kept in L1
+        RETRY_AFTER (float): Seconds L2 is left alone after failing
+    """
+
+    def __init__(self, location, params):
+        super(TieredCache, self).__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED', location)
+        self.max_size = int(options.get('MAX_SIZE', 32 * 1024 * 1024))
+        self.local_ttl = float(options.get('LOCAL_TTL', 5))
+        self.local_prefixes = tuple(options.get('LOCAL_PREFIXES', ()))
+        self.retry_after = float(options.get('RETRY_AFTER', 30))
+
+        # Pickled value, expiry time, stamp and time last checked per key
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.down_until = 0
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def is_local(self, key):
+        return key.startswith(self.local_prefixes)
+
+    def stamp_key(self, key):
+        return 'stamp:%s' % key
+
+    def available(self):
+        """
+        Returns:
+            bool: Whether L2 is used, false for a while after it failed
+        """
+        return time.monotonic() >= self.down_until
+
+    def failed(self, error):
+        """
+        Use L1 alone for RETRY_AFTER seconds after an L2 failure
+        """
+        self.down_until = time.monotonic() + self.retry_after
+        metrics.increment('cache_tier_lookups', 'shared:error')
+        logger.warning(
+            'Shared cache %s failed, using the process cache for %ss: %s',
+            self.shared_alias, self.retry_after, error
+        )
+
+    def seconds(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def wrap(self, value, timeout):
+        """
+        Returns:
+            (string, float, bytes): Stamp, expiry time and pickled value
+        """
+        return (
+            uuid.uuid4().hex, self.get_backend_timeout(timeout),
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        )
+
+    def local_get(self, key):
+        """
+        Returns:
+            list: Unexpired L1 entry of a key or None
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and entry[1] <= time.time():
+                self.local_delete([key])
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def local_set(self, key, stored, checked=None):
+        """
+        Keep a wrapped value in L1, evicting the least recently used entries
+        beyond MAX_SIZE
+        """
+        stamp, expires, data = stored
+        with self.lock:
+            self.local_delete([key])
+            if len(data) > self.max_size:
+                return
+            self.entries[key] = [data, expires, stamp, checked or time.time()]
+            self.size += len(data)
+            while self.size > self.max_size:
+                evicted, entry = self.entries.popitem(last=False)
+                self.size -= len(entry[0])
+
+    def local_delete(self, keys):
+        """
+        Drop keys from L1. Must be called with the lock held.
+        """
+        for key in keys:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.size -= len(entry[0])
+
+    def record(self, outcome):
+        metrics.increment('cache_tier_lookups', outcome)
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        if not self.is_local(key):
+            if self.available():
+                try:
+                    return self.shared.get(key, default, version=version)
+                except Exception as error:
+                    self.failed(error)
+            entry = self.local_get(local_key)
+            return default if entry is None else pickle.loads(entry[0])
+
+        entry = self.local_get(local_key)
+        now = time.time()
+        if entry is not None and (
+            not self.available() or now - entry[3] < self.local_ttl
+        ):
+            self.record('local')
+            return pickle.loads(entry[0])
+        if not self.available():
+            self.record('miss')
+            return default
+
+        try:
+            if entry is not None:
+                stamp = self.shared.get(self.stamp_key(key), version=version)
+                if stamp == entry[2]:
+                    entry[3] = now
+                    self.record('revalidated')
+                    return pickle.loads(entry[0])
+            stored = self.shared.get(key, version=version)
+        except Exception as error:
+            self.failed(error)
+            if entry is None:
+                return default
+            return pickle.loads(entry[0])
+
+        if stored is None:
+            with self.lock:
+                self.local_delete([local_key])
+            self.record('miss')
+            return default
+        self.local_set(local_key, stored, now)
+        self.record('shared')
+        return pickle.loads(stored[2])
+
+    def get_many(self, keys, version=None):
+        found = {}
+        shared_keys = []
+        for key in keys:
+            if self.is_local(key) or not self.available():
+                value = self.get(key, self._missing_key, version=version)
+                if value is not self._missing_key:
+                    found[key] = value
+            else:
+                shared_keys.append(key)
+        if shared_keys:
+            try:
+                found.update(self.shared.get_many(shared_keys, version=version))
+            except Exception as error:
+                self.failed(error)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.seconds(timeout)
+        shared = {}
+        local = {}
+        for key, value in data.items():
+            local_key = self.make_and_validate_key(key, version=version)
+            if self.is_local(key):
+                stored = local[local_key] = self.wrap(value, timeout)
+                shared[key] = stored
+                shared[self.stamp_key(key)] = stored[0]
+            else:
+                shared[key] = value
+
+        if self.available():
+            try:
+                self.shared.set_many(shared, timeout, version=version)
+            except Exception as error:
+                self.failed(error)
+        if not self.available():
+            for key, value in data.items():
+                if not self.is_local(key):
+                    local_key = self.make_and_validate_key(key, version=version)
+                    local[local_key] = self.wrap(value, timeout)
+        for local_key, stored in local.items():
+            self.local_set(local_key, stored)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.seconds(timeout)
+        local_key = self.make_and_validate_key(key, version=version)
+        stored = self.wrap(value, timeout)
+        if self.available():
+            try:
+                if not self.is_local(key):
+                    return self.shared.add(key, value, timeout, version=version)
+                if not self.shared.add(key, stored, timeout, version=version):
+                    return False
+                self.shared.set(self.stamp_key(key), stored[0], timeout, version=version)
+                self.local_set(local_key, stored)
+                return True
+            except Exception as error:
+                self.failed(error)
+
+        with self.lock:
+            if self.entries.get(local_key) is not None:
+                entry = self.entries[local_key]
+                if entry[1] is None or entry[1] > time.time():
+                    return False
+        self.local_set(local_key, stored)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        if self.is_local(key) or not self.available():
+            value = self.get(key, self._missing_key, version=version)
+            if value is self._missing_key:
+                return False
+            self.set(key, value, timeout, version)
+            return True
+        try:
+            return self.shared.touch(key, self.seconds(timeout), version=version)
+        except Exception as error:
+            self.failed(error)
+            return False
+
+    def incr(self, key, delta=1, version=None):
+        if self.is_local(key) or not self.available():
+            return super(TieredCache, self).incr(key, delta, version)
+        try:
+            return self.shared.incr(key, delta, version=version)
+        except ValueError:
+            raise
+        except Exception as error:
+            self.failed(error)
+            return super(TieredCache, self).incr(key, delta, version)
+
+    def delete(self, key, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        with self.lock:
+            deleted = self.entries.get(local_key) is not None
+            self.local_delete([local_key])
+        if self.available():
+            try:
+                if self.is_local(key):
+                    self.shared.delete(self.stamp_key(key), version=version)
+                return self.shared.delete(key, version=version)
+            except Exception as error:
+                self.failed(error)
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        with self.lock:
+            self.local_delete([
+                self.make_and_validate_key(key, version=version) for key in keys
+            ])
+        if self.available():
+            shared_keys = keys + [
+                self.stamp_key(key) for key in keys if self.is_local(key)
+            ]
+            try:
+                self.shared.delete_many(shared_keys, version=version)
+            except Exception as error:
+                self.failed(error)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+        try:
+            self.shared.clear()
+        except Exception as error:
+            self.failed(error)
+
+# Times until which fake shared caches fail, keyed on location
+outages = {}
+
+class FakeSharedCache(LocMemCache):
+    """
+    In-process stand-in for a networked shared cache, so the two-tier cache
+    can be run offline. Instances with the same location share entries,
+    like processes sharing a server. Every call waits LATENCY seconds like
+    a round trip, and fail_for() makes calls raise ConnectionError.
+
+    Options:
+        LATENCY (float): Seconds each call takes
+    """
+
+    def __init__(self, name, params):
+        super(FakeSharedCache, self).__init__(name, params)
+        self.location = name
+        self.latency = float(params.get('OPTIONS', {}).get('LATENCY', 0))
+
+    def fail_for(self, seconds):
+        """
+        Make every call to caches at this location fail for a while
+        """
+        outages[self.location] = time.time() + seconds
+
+    def round_trip(self):
+        if outages.get(self.location, 0) > time.time():
+            raise ConnectionError('Shared cache %s is down' % self.location)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def add(self, *args, **kwargs):
+        self.round_trip()
+        return super(FakeSharedCache, self).add(*args, **kwargs)
+
+    def get(self, *args, **kwargs):
+        self.round_trip()
+        return super(FakeSharedCache, self).get(*args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        self.round_trip()
+        return super(FakeSharedCache, self).set(*args, **kwargs)
+
+    def touch(self, *args, **kwargs):
+        self.round_trip()
+        return super(FakeSharedCache, self).touch(*args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        self.round_trip()
+        return super(FakeSharedCache, self).incr(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        self.round_trip()
+        return super(FakeSharedCache, self).delete(*args, **kwargs)
+
+    def has_key(self, *args, **kwargs):
+        self.round_trip()
+        return super(FakeSharedCache, self).has_key(*args, **kwargs)
+
+    def get_many(self, keys, version=None):
+        self.round_trip()
+        found = {}
+        for key in keys:
+            value = super(FakeSharedCache, self).get(key, self._missing_key, version)
+            if value is not self._missing_key:
+                found[key] = value
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self.round_trip()
+        for key, value in data.items():
+            super(FakeSharedCache, self).set(key, value, timeout, version)
+        return []
+
+    def delete_many(self, keys, version=None):
+        self.round_trip()
+        for key in keys:
+            super(FakeSharedCache, self).delete(key, version)
+
+    def clear(self):
+        self.round_trip()
+        super(FakeSharedCache, self).clear()
+
+# Backends whose entries are only seen by the process storing them
+PER_PROCESS = (DummyCache, LocMemCache)
+
+def is_shared(alias):
+    """
+    Whether the keys of a cache alias that are never kept in a process,
+    such as locks and counters, are currently seen by every worker process
+
+    Parameters:
+        alias (string): Cache alias
+
+    Returns:
+        bool: False for per-process backends and two-tier caches whose
+            shared tier is one or is down
+    """
+    cache = caches[alias]
+    if isinstance(cache, TieredCache):
+        return cache.available() and is_shared(cache.shared_alias)
+    return isinstance(cache, FakeSharedCache) or not isinstance(cache, PER_PROCESS)
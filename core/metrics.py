@@ -0,0 +1,218 @@
+import os
+import time
+import socket
+import threading
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings as dj_settings
+from django.core.cache import cache
+
+# Upper bounds in seconds of histogram buckets
+BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+
+# Exported metrics: type, label name and help text
+METRICS = {
+    'phase_seconds': (
+        'histogram', 'phase', 'Seconds spent in each phase of handling a request'
+    ),
+    'request_seconds': (
+        'histogram', 'view', 'Seconds taken to answer a request, per view'
+    ),
+    'ebay_cache_lookups': (
+        'counter', 'outcome', 'Ebay cache lookups, per outcome'
+    ),
+    'cache_tier_lookups': (
+        'counter', 'outcome',
+        'Two-tier cache lookups per tier answering them, and shared cache errors'
+    ),
+}
+
+# Aggregates of this process since it started, keyed on metric and label.
+# Histograms hold a count per bucket, then the sum and count of observations.
+counters = Counter()
+histograms = {}
+lock = threading.Lock()
+
+# Seconds spent per phase by the current request, shared with the threads
+# and tasks it runs code on
+timings = ContextVar('timings', default=None)
+
+process = '%s:%d' % (socket.gethostname(), os.getpid())
+flushed = 0
+
+def increment(name, label, amount=1):
+    """
+    Increase a counter of this process
+
+    Parameters:
+        name (string): Metric name from METRICS
+        label (string): Label value
+        amount (int): Amount added
+    """
+    with lock:
+        counters[name, label] += amount
+
+def observe(name, label, seconds):
+    """
+    Record an observation in a histogram of this process
+
+    Parameters:
+        name (string): Metric name from METRICS
+        label (string): Label value
+        seconds (float): Observed duration
+    """
+    with lock:
+        histogram = histograms.get((name, label))
+        if histogram is None:
+            histogram = histograms[name, label] = [0] * (len(BUCKETS) + 3)
+        histogram[bisect_left(BUCKETS, seconds)] += 1
+        histogram[-2] += seconds
+        histogram[-1] += 1
+
+def get_counter(name):
+    """
+    Returns:
+        Counter: Values of a counter of this process per label
+    """
+    with lock:
+        return Counter({
+            label: value for (metric, label), value in counters.items()
+            if metric == name
+        })
+
+def start_request():
+    """
+    Start timing the phases of the current request
+
+    Returns:
+        dict: Seconds spent per phase, filled in as phases end
+    """
+    spent = {}
+    timings.set(spent)
+    return spent
+
+@contextmanager
+def phase(name):
+    """
+    Time a phase of the current request. The time is added to the request's
+    Server-Timing header and to the phase histogram. Phases running in
+    parallel add up, so they may exceed the request's duration.
+
+    Parameters:
+        name (string): Phase name
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        observe('phase_seconds', name, seconds)
+        spent = timings.get()
+        if spent is not None:
+            spent[name] = spent.get(name, 0) + seconds
+
+def server_timing(spent, total):
+    """
+    Build a Server-Timing header value
+
+    Parameters:
+        spent (dict): Seconds spent per phase
+        total (float): Seconds taken by the request
+
+    Returns:
+        string: Header value with durations in milliseconds
+    """
+    entries = ['%s;dur=%.1f' % (name, seconds * 1000) for name, seconds in spent.items()]
+    entries.append('total;dur=%.1f' % (total * 1000))
+    return ', '.join(entries)
+
+def flush_due():
+    """
+    Returns:
+        bool: Whether this process's aggregates should be shared again
+    """
+    return time.time() - flushed >= dj_settings.METRICS_FLUSH_INTERVAL
+
+def flush():
+    """
+    Share this process's aggregates through the default cache so any process
+    can export the metrics of every worker. Aggregates of processes that
+    stopped flushing expire after a few intervals.
+    """
+    global flushed
+    flushed = time.time()
+    with lock:
+        snapshot = {
+            'counters': dict(counters),
+            'histograms': {key: list(value) for key, value in histograms.items()},
+        }
+    timeout = 4 * dj_settings.METRICS_FLUSH_INTERVAL
+    cache.set('metrics:process:%s' % process, snapshot, timeout)
+
+    processes = cache.get('metrics:processes', [])
+    if process not in processes:
+        cache.set('metrics:processes', processes + [process], None)
+
+def collect():
+    """
+    Add up the shared aggregates of every process, forgetting processes
+    whose aggregates expired
+
+    Returns:
+        (Counter, dict): Counters and histograms keyed on metric and label
+    """
+    flush()
+    processes = cache.get('metrics:processes', [])
+    snapshots = cache.get_many(['metrics:process:%s' % each for each in processes])
+    alive = [each for each in processes if 'metrics:process:%s' % each in snapshots]
+    if alive != processes:
+        cache.set('metrics:processes', alive, None)
+
+    total_counters = Counter()
+    total_histograms = {}
+    for snapshot in snapshots.values():
+        total_counters.update(snapshot['counters'])
+        for key, value in snapshot['histograms'].items():
+            total = total_histograms.setdefault(key, [0] * len(value))
+            for index, amount in enumerate(value):
+                total[index] += amount
+    return total_counters, total_histograms
+
+def render(counters, histograms):
+    """
+    Format aggregates in the Prometheus text exposition format
+
+    Returns:
+        string: Metrics text
+    """
+    lines = []
+    for name, (kind, label, help_text) in METRICS.items():
+        metric = 'sparedwares_%s' % name
+        if kind == 'counter':
+            metric += '_total'
+        lines.append('# HELP %s %s' % (metric, help_text))
+        lines.append('# TYPE %s %s' % (metric, kind))
+
+        if kind == 'counter':
+            for (each, value), amount in sorted(counters.items()):
+                if each == name:
+                    lines.append('%s{%s="%s"} %d' % (metric, label, value, amount))
+            continue
+
+        for (each, value), histogram in sorted(histograms.items()):
+            if each != name:
+                continue
+            cumulative = 0
+            for bound, amount in zip(BUCKETS + ('+Inf',), histogram):
+                cumulative += amount
+                lines.append('%s_bucket{%s="%s",le="%s"} %d' % (
+                    metric, label, value, bound, cumulative
+                ))
+            lines.append('%s_sum{%s="%s"} %.6f' % (metric, label, value, histogram[-2]))
+            lines.append('%s_count{%s="%s"} %d' % (metric, label, value, histogram[-1]))
+    return '\n'.join(lines) + '\n'
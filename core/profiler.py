@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import threading
+from collections import Counter
+
+from asgiref.sync import (
+    iscoroutinefunction, markcoroutinefunction, sync_to_async
+)
+
+from django.conf import settings as dj_settings
+from django.core.exceptions import MiddlewareNotUsed
+
+# Functions a thread is found in while it waits for work or I/O. Samples
+# of idle threads are dropped.
+IDLE = {'select', 'poll', 'wait', '_worker', 'accept'}
+
+# Deepest stack recorded per sample
+MAX_DEPTH = 64
+
+class Profile:
+    """
+    Stack samples taken while a request is handled
+
+    Attributes:
+        started (float): Time the request started
+        sampled (bool): Whether the whole request is profiled, otherwise
+            sampling starts once it has run for PROFILER_SLOW_THRESHOLD
+    """
+
+    def __init__(self, sampled):
+        self.started = time.perf_counter()
+        self.sampled = sampled
+        self.samples = Counter()
+
+    def recording_from(self):
+        """
+        Returns:
+            float: Time samples are taken from, None if never
+        """
+        if self.sampled:
+            return self.started
+        if dj_settings.PROFILER_SLOW_THRESHOLD is None:
+            return None
+        return self.started + dj_settings.PROFILER_SLOW_THRESHOLD
+
+def frame_name(frame):
+    """
+    Returns:
+        string: Function of a frame and the module file it is defined in
+    """
+    code = frame.f_code
+    path = code.co_filename.rsplit(os.sep, 2)
+    return '%s:%s' % ('/'.join(path[-2:]), getattr(code, 'co_qualname', code.co_name))
+
+def fold(frame):
+    """
+    Fold a thread's stack into a single string, outermost call first
+
+    Returns:
+        string: Function names separated by semicolons, None if idle
+    """
+    if frame.f_code.co_name in IDLE:
+        return None
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class Sampler(threading.Thread):
+    """
+    Background thread sampling the stacks of every thread of the process
+    while profiled requests run. Requests handled concurrently share the
+    process, so their samples may include each other's work. The thread
+    sleeps until the earliest request could start recording.
+    """
+
+    def __init__(self):
+        super(Sampler, self).__init__(name='profiler', daemon=True)
+        self.profiles = set()
+        self.condition = threading.Condition()
+
+    def add(self, profile):
+        with self.condition:
+            self.profiles.add(profile)
+            self.condition.notify()
+
+    def remove(self, profile):
+        with self.condition:
+            self.profiles.discard(profile)
+
+    def run(self):
+        while True:
+            with self.condition:
+                now = time.perf_counter()
+                starts = [
+                    (profile.recording_from(), profile) for profile in self.profiles
+                ]
+                recording = [
+                    profile for start, profile in starts
+                    if start is not None and start <= now
+                ]
+                if not recording:
+                    waiting = [start for start, profile in starts if start is not None]
+                    self.condition.wait(min(waiting) - now if waiting else None)
+                    continue
+
+            frames = sys._current_frames()
+            frames.pop(threading.get_ident(), None)
+            stacks = [stack for stack in map(fold, frames.values()) if stack]
+            with self.condition:
+                for profile in recording:
+                    if profile in self.profiles:
+                        profile.samples.update(stacks)
+            time.sleep(dj_settings.PROFILER_INTERVAL)
+
+sampler = None
+sampler_lock = threading.Lock()
+
+def get_sampler():
+    """
+    Get the process's sampler thread, starting it on first use
+    """
+    global sampler
+    if sampler is None:
+        with sampler_lock:
+            if sampler is None:
+                sampler = Sampler()
+                sampler.start()
+    return sampler
+
+def store(request, response, profile, duration):
+    """
+    Write a request's profile to the ring of PROFILER_KEEP files in
+    PROFILER_DIR, deleting the oldest profiles
+    """
+    os.makedirs(dj_settings.PROFILER_DIR, exist_ok=True)
+    name = '%.6f-%s.json' % (time.time(), uuid.uuid4().hex[:8])
+    data = {
+        'time': time.time(), 'method': request.method, 'path': request.path,
+        'query': request.META.get('QUERY_STRING', ''),
+        'status': response.status_code, 'duration': duration,
+        'reason': 'sampled' if profile.sampled else 'slow',
+        'interval': dj_settings.PROFILER_INTERVAL,
+        'samples': dict(profile.samples),
+    }
+    path = os.path.join(dj_settings.PROFILER_DIR, name)
+    with open(path + '.tmp', 'w') as stored:
+        json.dump(data, stored)
+    os.replace(path + '.tmp', path)
+
+    names = sorted(list_profiles())
+    for old in names[:-dj_settings.PROFILER_KEEP]:
+        try:
+            os.remove(os.path.join(dj_settings.PROFILER_DIR, old))
+        except FileNotFoundError:
+            pass
+
+def list_profiles():
+    """
+    Returns:
+        [string]: File names of stored profiles, oldest first
+    """
+    try:
+        names = os.listdir(dj_settings.PROFILER_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(name for name in names if name.endswith('.json'))
+
+def load_profile(name):
+    """
+    Returns:
+        dict: Stored profile, None if it doesn't exist
+    """
+    if name not in list_profiles():
+        return None
+    with open(os.path.join(dj_settings.PROFILER_DIR, name)) as stored:
+        return json.load(stored)
+
+def hottest(samples):
+    """
+    Rank functions by the samples they were running in, on their own and
+    including the functions they called
+
+    Parameters:
+        samples (dict): Sample count per folded stack
+
+    Returns:
+        [(string, int, int)]: Functions with their own and total samples,
+            most own samples first
+    """
+    own = Counter()
+    total = Counter()
+    for stack, count in samples.items():
+        names = stack.split(';')
+        own[names[-1]] += count
+        for name in set(names):
+            total[name] += count
+    return sorted(
+        [(name, own[name], count) for name, count in total.items()],
+        key=lambda row: (-row[1], -row[2])
+    )
+
+class SamplingProfiler:
+    """
+    Profile one request in PROFILER_SAMPLE_RATE, and requests still running
+    after PROFILER_SLOW_THRESHOLD seconds from that point on, storing their
+    stack samples. Not used at all when both are disabled.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not dj_settings.PROFILER_SAMPLE_RATE and dj_settings.PROFILER_SLOW_THRESHOLD is None:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def start(self):
+        rate = dj_settings.PROFILER_SAMPLE_RATE
+        profile = Profile(bool(rate) and random.randrange(rate) == 0)
+        get_sampler().add(profile)
+        return profile
+
+    def finish(self, request, response, profile):
+        """
+        Returns:
+            float: Request duration if the profile should be stored, else None
+        """
+        get_sampler().remove(profile)
+        if not profile.samples:
+            return None
+        return time.perf_counter() - profile.started
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = self.start()
+        response = self.get_response(request)
+        duration = self.finish(request, response, profile)
+        if duration is not None:
+            store(request, response, profile, duration)
+        return response
+
+    async def __acall__(self, request):
+        profile = self.start()
+        response = await self.get_response(request)
+        duration = self.finish(request, response, profile)
+        if duration is not None:
+            await sync_to_async(store, thread_sensitive=False)(
+                request, response, profile, duration
+            )
+        return response
@@ -1,7 +1,29 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
 from django.http import HttpResponsePermanentRedirect
-from django.utils.deprecation import MiddlewareMixin
 
-class RedirectSlash(MiddlewareMixin):
+class RedirectSlash:
+    """
+    Add the trailing slash to admin URLs and remove it from every other URL.
+    Works without a thread switch under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_request(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.process_request(request) or await self.get_response(request)
+
     def process_request(self, request):
         if '/admin' in request.path:
             if request.path[-1] != '/':
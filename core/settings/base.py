@@ -27,6 +27,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.timing.ServerTiming',
+    'core.profiler.SamplingProfiler',
     'core.redirect.RedirectSlash',
 
     'django.middleware.security.SecurityMiddleware',
@@ -37,7 +39,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.staticfiles.StaticFiles',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -59,6 +61,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
 
 
 # Password validation
@@ -85,8 +88,6 @@ TIME_ZONE = 'UTC'
 
 USE_I18N = True
 
-USE_L10N = True
-
 USE_TZ = True
 
 
@@ -100,20 +101,215 @@ STATICFILES_DIRS = (
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Widths of the WebP variants built for category and product images, their
+# quality, and the width images are shown at for the sizes attribute
+IMAGE_VARIANT_WIDTHS = [100, 200, 300]
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_SIZES = '100px'
+
 
 # redirect urls
 APPEND_SLASH = False
 
 
+# Identifier of the deployed code, part of entity tags and cached fragment
+# keys so a deploy changing the markup is never answered with an old copy.
+# Heroku sets HEROKU_SLUG_COMMIT when dyno metadata is enabled. Without it
+# the templates are hashed when a process starts.
+BUILD_ID = os.environ.get('BUILD_ID') or os.environ.get('HEROKU_SLUG_COMMIT')
+
+
 # IP location
 GEOIP_PATH = os.path.join(BASE_DIR, 'GeoLite2-City.mmdb')
+GEOIP_CACHE_SIZE = 10000
+
+# How buyer postal codes sent to Ebay are generalized: 'prefix' (3-digit ZIP
+# prefix), 'exact' or 'none'
+GEOIP_POSTAL_BUCKET = 'prefix'
 
 
 # users
 AUTH_USER_MODEL = 'users.User'
 
 
+# Cache
+# The default cache holds catalog and refinement versions and metrics. It is
+# a SQLite database shared by every worker process on the machine, so
+# versions apply to all of them. With several machines it must be shared by
+# all of them too, as in production with Redis, or entity tags and cached
+# derived data disagree between machines.
+#
+# Ebay responses, the listings built from them and their rendered fragments
+# are cached per canonical request in two tiers: an LRU in each process in
+# front of the ebay_shared alias. Locally that is a SQLite database evicting
+# the entries soonest to expire once MAX_SIZE is reached. Across machines it
+# should be a networked backend such as Redis or memcached, so every machine
+# serves the others' entries instead of calling Ebay for its own copy.
+# core.cache.FakeSharedCache stands in for one offline.
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'default.sqlite3'),
+        'OPTIONS': {
+            'MAX_SIZE': 16 * 1024 * 1024,
+        },
+    },
+    'ebay': {
+        'BACKEND': 'core.cache.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'ebay_shared',
+            'MAX_SIZE': 32 * 1024 * 1024,
+            'LOCAL_TTL': 5,
+            'LOCAL_PREFIXES': ['ebay:', 'html:'],
+            'RETRY_AFTER': 30,
+        },
+    },
+    'ebay_shared': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'ebay.sqlite3'),
+        'OPTIONS': {
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
+    },
+}
+
+# Seconds an Ebay response is fresh, then how long it may still be served
+# while a single caller refreshes it, at most as long as it was fresh
+EBAY_CACHE_TTL = 3600
+EBAY_CACHE_STALE_TTL = 900
+
+# Seconds Ebay responses are fresh per sort order, EBAY_CACHE_TTL for sorts
+# not listed. Auctions ending soonest change by the minute, while fixed price
+# listings sorted by price or start time hardly change. Listing end times
+# are stored, so countdowns stay right whatever the TTL.
+EBAY_CACHE_TTLS = {
+    'time': 300,
+    'best': 3600,
+    'price': 4 * 3600,
+    '-price': 4 * 3600,
+    '-time': 4 * 3600,
+}
+
+# Overrides per category slug, applying to its subcategories too: seconds
+# for every sort order, or a dictionary of seconds per sort order
+EBAY_CATEGORY_CACHE_TTLS = {}
+
+# Seconds a copy of each Ebay response is kept after it was fetched, served
+# only when Ebay can't be called
+EBAY_CACHE_KEEP_TTL = 7 * 24 * 3600
+
+# Seconds a refresh lock is held at most, and how long other callers wait
+# for its result when no stale copy exists
+EBAY_CACHE_LOCK_TIMEOUT = 30
+EBAY_CACHE_LOCK_WAIT = 10
+
+# Threads overlapping Shopping API calls with parsing, and threads fetching
+# the next page of results in the background
+EBAY_PIPELINE_WORKERS = 4
+EBAY_PREFETCH = True
+EBAY_PREFETCH_WORKERS = 2
+
+# Finding API entries fetched per call, up to 100. Pages of 20 listings are
+# served from the window, so "Load More" only costs a Shopping API call
+# until the window is used up. Ajax requests may ask for several pages.
+EBAY_WINDOW_SIZE = 100
+EBAY_MAX_PAGES = 5
+
+# Outbound Ebay calls are limited across every machine sharing the ebay
+# cache's shared tier by a token bucket of EBAY_RATE_BURST calls refilled at
+# EBAY_RATE_LIMIT calls per second, and by daily quotas per API method (UTC
+# days). When either is exhausted cached responses of any age are served.
+# While that state can't be shared, each of the EBAY_PROCESSES worker
+# processes of a machine gets its part of the limits.
+EBAY_RATE_LIMIT = 2
+EBAY_RATE_BURST = 20
+EBAY_PROCESSES = int(os.environ.get('WEB_CONCURRENCY', 1))
+EBAY_DAILY_QUOTA = {
+    'findItemsAdvanced': 5000,
+    'GetMultipleItems': 5000,
+}
+
+# Local listing store: listings synced per product by the sync_listings
+# command, fetched in windows of EBAY_WINDOW_SIZE, and how many seconds
+# after a sync the store answers requests. Products with more listings
+# than the store holds are always searched on Ebay.
+EBAY_STORE_SIZE = 500
+EBAY_STORE_TTL = 3600
+
+# Cache warmer: Ebay calls it may make per hour, concurrent calls, and how
+# many seconds before an entry goes stale it is refreshed. Passes must run
+# more often than the margin for entries to stay fresh.
+EBAY_WARM_BUDGET = 600
+EBAY_WARM_CONCURRENCY = 2
+EBAY_WARM_MARGIN = 600
+
+
+# Seconds a product's compiled refinements are reused. Catalog edits rebuild
+# them sooner in every process sharing the default cache.
+REFINEMENT_INDEX_TTL = 300
+
+# Seconds the category and product tree snapshot is reused. Catalog edits
+# rebuild it sooner in every process sharing the default cache.
+CATALOG_TTL = 300
+
+
+# Ebay API endpoints, which can point at a local stub server for testing
+EBAY_FINDING_DOMAIN = os.environ.get('EBAY_FINDING_DOMAIN', 'svcs.ebay.com')
+EBAY_SHOPPING_DOMAIN = os.environ.get('EBAY_SHOPPING_DOMAIN', 'open.api.ebay.com')
+EBAY_HTTPS = os.environ.get('EBAY_HTTPS', 'true') == 'true'
+EBAY_CA_BUNDLE = os.environ.get('EBAY_CA_BUNDLE')
+
+# Most connections the shared session of an event loop opens for
+# asynchronous calls. Threads keep one keep-alive connection per API each.
+EBAY_ASYNC_CONNECTIONS = 20
+
+# Seconds to connect to Ebay and to wait for its response. Failed calls are
+# not retried.
+EBAY_CONNECT_TIMEOUT = 3
+EBAY_READ_TIMEOUT = 10
+
+# An API method's circuit opens after EBAY_BREAKER_THRESHOLD consecutive
+# timeouts, connection or server errors within EBAY_BREAKER_WINDOW seconds.
+# Calls are then refused for EBAY_BREAKER_COOLDOWN seconds before a single
+# probe call is let through, and cached responses are served meanwhile.
+# While the circuit can't be shared, each of the EBAY_PROCESSES worker
+# processes opens its own after its share of the failures.
+EBAY_BREAKER_THRESHOLD = 5
+EBAY_BREAKER_WINDOW = 60
+EBAY_BREAKER_COOLDOWN = 30
+
+# Seconds a failed Ebay response is cached so the same request is not sent
+# again while it keeps failing: timeouts, connection and server errors, then
+# errors Ebay answered for the request itself
+EBAY_NEGATIVE_TTL = 60
+EBAY_ANSWERED_ERROR_TTL = 600
+
+
+# Send the time spent in each phase of a request in a Server-Timing header.
+# Every process shares its timings and cache counters through the default
+# cache every METRICS_FLUSH_INTERVAL seconds for the metrics endpoint, which
+# scrapers call with METRICS_TOKEN as a bearer token.
+SERVER_TIMING = True
+METRICS_FLUSH_INTERVAL = 15
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Sample the stacks of one request in PROFILER_SAMPLE_RATE, and of requests
+# running longer than PROFILER_SLOW_THRESHOLD seconds from then on, every
+# PROFILER_INTERVAL seconds. The last PROFILER_KEEP profiles are stored in
+# PROFILER_DIR and listed at /admin/profiles/. The profiler is not used at
+# all unless a rate or threshold is set.
+PROFILER_SAMPLE_RATE = int(os.environ.get('PROFILER_SAMPLE_RATE', 0))
+PROFILER_SLOW_THRESHOLD = (
+    float(os.environ['PROFILER_SLOW_THRESHOLD'])
+    if os.environ.get('PROFILER_SLOW_THRESHOLD') else None
+)
+PROFILER_INTERVAL = 0.005
+PROFILER_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILER_KEEP = 200
+
+
 # Database
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
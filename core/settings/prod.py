@@ -7,6 +7,31 @@ DEBUG = False
 
 ALLOWED_HOSTS = ['.sparedwares.com', '.herokuapp.com']
 
+# Dynos share cached Ebay results through Heroku Redis when it is attached,
+# and the default cache too, so catalog and refinement versions, entity tags
+# and metrics agree across dynos. Its TLS certificates are self-signed.
+if os.environ.get('REDIS_URL'):
+    redis = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+        'OPTIONS': {
+            'ssl_cert_reqs': None,
+        } if os.environ['REDIS_URL'].startswith('rediss://') else {},
+    }
+    CACHES['ebay_shared'] = dict(redis, KEY_PREFIX='ebay')
+    CACHES['default_shared'] = dict(redis, KEY_PREFIX='default')
+
+    # Versions are read from Redis on every request, while each dyno keeps
+    # its own copy only while Redis is unavailable
+    CACHES['default'] = {
+        'BACKEND': 'core.cache.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'default_shared',
+            'MAX_SIZE': 16 * 1024 * 1024,
+            'RETRY_AFTER': 30,
+        },
+    }
+
 # Cloudinary settings
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': os.environ.get('CLOUDINARY_NAME'),
@@ -0,0 +1,39 @@
+from asgiref.sync import (
+    iscoroutinefunction, markcoroutinefunction, sync_to_async
+)
+
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+class StaticFiles(WhiteNoiseMiddleware):
+    """
+    WhiteNoise middleware that also runs natively under ASGI. WhiteNoise is
+    sync-only, so Django would otherwise run every request, static or not,
+    through a thread. Other requests are passed on without one, and static
+    files are opened in a worker thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super(StaticFiles, self).__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super(StaticFiles, self).__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(
+                self.find_file, thread_sensitive=False
+            )(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+        return await sync_to_async(self.serve, thread_sensitive=False)(
+            static_file, request
+        )
@@ -0,0 +1,52 @@
+import time
+
+from asgiref.sync import (
+    iscoroutinefunction, markcoroutinefunction, sync_to_async
+)
+
+from django.conf import settings as dj_settings
+
+from . import metrics
+
+class ServerTiming:
+    """
+    Time every request, recording its duration per view and sending the time
+    spent in each of its phases in a Server-Timing header. Works without a
+    thread switch under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        spent = metrics.start_request()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.finish(request, response, spent, started)
+        if metrics.flush_due():
+            metrics.flush()
+        return response
+
+    async def __acall__(self, request):
+        spent = metrics.start_request()
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.finish(request, response, spent, started)
+        if metrics.flush_due():
+            await sync_to_async(metrics.flush, thread_sensitive=False)()
+        return response
+
+    def finish(self, request, response, spent, started):
+        total = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else 'other'
+        metrics.observe('request_seconds', view, total)
+        if dj_settings.SERVER_TIMING:
+            response.headers['Server-Timing'] = metrics.server_timing(spent, total)
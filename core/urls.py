@@ -5,13 +5,20 @@ from django.conf import settings
 from home.views import HomePage
 from products.views import CategoryList
 
+from .views import metrics_view, profile, profiles
+
 admin.site.site_title = 'SparedWares Admin'
 admin.site.site_header = 'SparedWares Admin'
 
 urlpatterns = [
+    path('admin/profiles/', profiles, name='profiles'),
+    path('admin/profiles/<str:name>/', profile, name='profile'),
     path('admin/', admin.site.urls),
     path('categories', CategoryList.as_view(), name='categories'),
 
+    path('ebay/', include('ebay.urls')),
+    path('metrics', metrics_view, name='metrics'),
+
     path('', HomePage.as_view(), name='home'),
     path('', include('products.urls')),
 ]
@@ -0,0 +1,67 @@
+import os
+import hashlib
+from functools import lru_cache
+
+from django.conf import settings as dj_settings
+from django.core.cache import cache
+from django.template import engines
+
+def get_version(name):
+    """
+    Get the current version of a named data set. Versions are kept in the
+    default cache so every process sharing it, on every machine in
+    production, sees the same value.
+
+    Parameters:
+        name (string): Data set name
+
+    Returns:
+        int: Current version
+    """
+    key = 'version:%s' % name
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+def bump_version(name):
+    """
+    Increase the version of a named data set so derived data built from an
+    older version is rebuilt
+
+    Parameters:
+        name (string): Data set name
+
+    Returns:
+        int: New version
+    """
+    key = 'version:%s' % name
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+        return 2
+
+@lru_cache(maxsize=None)
+def get_build_id():
+    """
+    Get the identifier of the deployed code: BUILD_ID when set, otherwise a
+    hash of every template, computed once per process
+
+    Returns:
+        string: Build identifier
+    """
+    if dj_settings.BUILD_ID:
+        return dj_settings.BUILD_ID
+    digest = hashlib.sha1()
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            for root, dirs, files in os.walk(directory):
+                dirs.sort()
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    digest.update(path.encode())
+                    with open(path, 'rb') as template:
+                        digest.update(template.read())
+    return digest.hexdigest()
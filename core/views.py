@@ -0,0 +1,67 @@
+import hmac
+from datetime import datetime
+
+from django.conf import settings as dj_settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.shortcuts import render
+
+from . import metrics, profiler
+
+def metrics_view(request):
+    """
+    Export request timings and cache counters of every process in the
+    Prometheus text format. Scrapers authenticate with a bearer token
+    matching METRICS_TOKEN, staff users with their session.
+    """
+    token = dj_settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    authorized = request.user.is_active and request.user.is_staff
+    if token and hmac.compare_digest(authorization, 'Bearer %s' % token):
+        authorized = True
+    if not authorized:
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        metrics.render(*metrics.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+@staff_member_required
+def profiles(request):
+    """
+    List the stored request profiles, newest first
+    """
+    stored = []
+    for name in reversed(profiler.list_profiles()):
+        profile = profiler.load_profile(name)
+        if profile:
+            profile['name'] = name
+            profile['time'] = datetime.fromtimestamp(profile['time'])
+            profile['duration'] *= 1000
+            profile['total'] = sum(profile.pop('samples').values())
+            stored.append(profile)
+    return render(request, 'admin/profiles.html', dict(
+        admin.site.each_context(request), title='Request profiles',
+        profiles=stored,
+    ))
+
+@staff_member_required
+def profile(request, name):
+    """
+    Show the hottest functions and stacks of a stored request profile
+    """
+    stored = profiler.load_profile(name)
+    if stored is None:
+        raise Http404('No profile found matching the query')
+    samples = stored['samples']
+    functions = profiler.hottest(samples)
+    stacks = sorted(samples.items(), key=lambda item: -item[1])[:20]
+    return render(request, 'admin/profile.html', dict(
+        admin.site.each_context(request), title='Request profile',
+        profile=stored, name=name, total=sum(samples.values()),
+        by_own=functions[:40],
+        by_total=sorted(functions, key=lambda row: -row[2])[:40],
+        stacks=stacks,
+    ))
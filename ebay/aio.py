@@ -0,0 +1,105 @@
+import ssl
+import asyncio
+
+import aiohttp
+
+from django.conf import settings as dj_settings
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+# Session holders of the event loops sessions were opened on
+holders = {}
+
+def open_session(ca_bundle=None):
+    """
+    Open an HTTP session for asynchronous Ebay API calls. Its connections
+    are kept alive between calls, and close when the session is closed.
+
+    Parameters:
+        ca_bundle (string): CA bundle path, EBAY_CA_BUNDLE by default
+
+    Returns:
+        ClientSession: aiohttp client session
+    """
+    ssl_context = True
+    ca_bundle = ca_bundle or dj_settings.EBAY_CA_BUNDLE
+    if ca_bundle:
+        ssl_context = ssl.create_default_context(cafile=ca_bundle)
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=dj_settings.EBAY_ASYNC_CONNECTIONS, ssl=ssl_context
+        ),
+        timeout=aiohttp.ClientTimeout(
+            total=dj_settings.EBAY_CONNECT_TIMEOUT + dj_settings.EBAY_READ_TIMEOUT,
+            sock_connect=dj_settings.EBAY_CONNECT_TIMEOUT,
+            sock_read=dj_settings.EBAY_READ_TIMEOUT
+        )
+    )
+
+async def hold_session():
+    """
+    Hold a shared session open until the event loop shuts down its async
+    generators when it stops, which closes the session inside the loop
+    """
+    session = open_session()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+async def get_session():
+    """
+    Get the running event loop's shared session, opening it on first use.
+    Holders of closed loops are dropped, since loops that ran a single
+    request have closed their session already.
+
+    Returns:
+        ClientSession: aiohttp client session
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in holders:
+        for closed in [other for other in holders if other.is_closed()]:
+            del holders[closed]
+        holder = hold_session()
+        holders[loop] = (holder, await holder.__anext__())
+    return holders[loop][1]
+
+async def execute(session, connection, verb, data):
+    """
+    Execute an Ebaysdk request over an asyncio HTTP session. Ebaysdk still
+    builds the request and parses the response, so the result matches
+    Connection.execute().
+
+    Parameters:
+        session (ClientSession): aiohttp client session
+        connection: Ebaysdk connection object
+        verb (string): Ebay API search type
+        data (dict): Settings dictionary
+
+    Returns:
+        dict: Ebay response data
+
+    Raises:
+        ConnectionError: Ebaysdk error if the response contains errors
+    """
+    connection._reset()
+    connection._list_nodes += connection.base_list_nodes
+    connection.build_request(verb, data, None)
+    request = connection.request
+
+    async with session.request(
+        request.method, request.url, data=request.body,
+        headers=dict(request.headers)
+    ) as reply:
+        response = Response()
+        response._content = await reply.read()
+        response.status_code = reply.status
+        response.reason = reply.reason
+        response.headers = CaseInsensitiveDict(reply.headers)
+        response.url = str(reply.url)
+
+    connection.response = response
+    connection.process_response()
+    connection.error_check()
+    return connection.response.dict()
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class EbayConfig(AppConfig):
     name = 'ebay'
+
+    def ready(self):
+        from . import checks, signals
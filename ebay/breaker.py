@@ -0,0 +1,75 @@
+import time
+import logging
+
+from django.conf import settings as dj_settings
+
+from .errors import CircuitOpen
+from .quota import get_cache, incr, share
+
+logger = logging.getLogger(__name__)
+
+def check(method):
+    """
+    Allow or refuse an Ebay call according to the method's circuit, which
+    is shared by every process using the shared cache. A closed circuit
+    allows every call. An open circuit refuses calls until
+    EBAY_BREAKER_COOLDOWN has passed, then is half open: a single caller
+    probes Ebay while the others are still refused.
+
+    Parameters:
+        method (string): Ebay API search type
+
+    Raises:
+        CircuitOpen: The call must not be made
+    """
+    cache = get_cache()
+    opened = cache.get('breaker:%s:open' % method)
+    if opened is None:
+        return
+    if time.time() - opened >= dj_settings.EBAY_BREAKER_COOLDOWN:
+        timeout = dj_settings.EBAY_CONNECT_TIMEOUT + dj_settings.EBAY_READ_TIMEOUT
+        if cache.add('breaker:%s:probe' % method, True, timeout):
+            return
+    raise CircuitOpen(method, 'Ebay %s circuit is open' % method)
+
+def succeeded(method):
+    """
+    Close the method's circuit after a successful call
+    """
+    get_cache().delete_many([
+        'breaker:%s:failures' % method, 'breaker:%s:open' % method,
+        'breaker:%s:probe' % method,
+    ])
+
+def failed(method):
+    """
+    Count a failed call, opening the method's circuit after
+    EBAY_BREAKER_THRESHOLD consecutive failures within EBAY_BREAKER_WINDOW,
+    or reopening it when a half open probe fails. While the circuit isn't
+    shared, each process opens its own after its share of the failures.
+    """
+    cache = get_cache()
+    open_key = 'breaker:%s:open' % method
+    if cache.get(open_key) is not None:
+        cache.set(open_key, time.time(), None)
+        cache.delete('breaker:%s:probe' % method)
+        return
+
+    failures = incr(
+        'breaker:%s:failures' % method, timeout=dj_settings.EBAY_BREAKER_WINDOW
+    )
+    if failures * share() >= dj_settings.EBAY_BREAKER_THRESHOLD:
+        cache.set(open_key, time.time(), None)
+        logger.warning('Ebay %s circuit opened after %d failures', method, failures)
+
+def state(method):
+    """
+    Returns:
+        string: 'closed', 'open' or 'half-open'
+    """
+    opened = get_cache().get('breaker:%s:open' % method)
+    if opened is None:
+        return 'closed'
+    if time.time() - opened < dj_settings.EBAY_BREAKER_COOLDOWN:
+        return 'open'
+    return 'half-open'
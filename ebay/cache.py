@@ -0,0 +1,535 @@
+import re
+import json
+import time
+import asyncio
+import uuid
+import hashlib
+import logging
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings as dj_settings
+from django.core.cache import caches
+
+from core import metrics
+
+from .quota import count
+from .errors import Unavailable, UpstreamError
+
+logger = logging.getLogger(__name__)
+
+# Background workers used to refresh stale entries after they are served
+refresher = ThreadPoolExecutor(max_workers=2)
+
+def get_cache():
+    """
+    Get the cache backend configured for Ebay responses
+
+    Returns:
+        BaseCache: Django cache backend for the 'ebay' alias
+    """
+    return caches['ebay']
+
+def canonicalize(value, name=None):
+    """
+    Normalize a settings value so equivalent requests compare equal. Lists
+    are sorted, dictionaries are canonicalized per key and keywords are case
+    and whitespace normalized. The buyer postal code is already bucketed when
+    the settings are built.
+
+    Parameters:
+        value: Settings value (dict, list or scalar)
+        name (string): Key the value is stored under in its parent dict
+
+    Returns:
+        Canonical form of the value
+    """
+    if isinstance(value, dict):
+        return {k: canonicalize(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        values = [canonicalize(v) for v in value]
+        return sorted(values, key=lambda v: json.dumps(v, sort_keys=True))
+    if name == 'keywords':
+        return re.sub(r'\s+', ' ', value).strip().lower()
+    return str(value)
+
+def make_key(method, settings, version=None):
+    """
+    Build a stable cache key from an Ebay API method and its settings
+
+    Parameters:
+        method (string): Ebay API search type
+        settings (dict): Settings dictionary
+        version (string): Version of the tags of the catalog data the
+            settings were built from, from tag_version
+
+    Returns:
+        string: Cache key
+    """
+    data = json.dumps(canonicalize(settings), sort_keys=True, separators=(',', ':'))
+    if version:
+        data = '%s|%s' % (data, version)
+    return 'ebay:%s:%s' % (method, hashlib.sha1(data.encode()).hexdigest())
+
+def record_lookup(outcome):
+    """
+    Count a cache lookup in the metrics of this process
+
+    Parameters:
+        outcome (string): 'response:fresh', 'response:stale' or
+            'response:miss' for Ebay responses, 'items:hit' or 'items:miss'
+            for listings built from them
+    """
+    metrics.increment('ebay_cache_lookups', outcome)
+
+def lookup_outcome(response, age, ttl=None):
+    """
+    Returns:
+        string: Outcome of looking up an Ebay response
+    """
+    if response is None or not is_servable(age, ttl):
+        return 'response:miss'
+    if age >= (ttl or dj_settings.EBAY_CACHE_TTL):
+        return 'response:stale'
+    return 'response:fresh'
+
+def get_entry(key):
+    """
+    Get a cached entry and its age regardless of freshness
+
+    Returns:
+        (dict, float): Cached response and age in seconds, or (None, None)
+    """
+    entry = get_cache().get(key)
+    if entry is None:
+        return None, None
+    return entry['data'], time.time() - entry['time']
+
+def keep_key(key):
+    """
+    Returns:
+        string: Key of the copy of a response kept for when Ebay can't be
+            called
+    """
+    return 'keep:%s' % key
+
+def set_entry(key, response, fallback_key=None, ttl=None):
+    """
+    Store an Ebay response with its fetch time. The entry expires with its
+    stale window, so the cache never loads entries too old to serve. A copy
+    is kept for EBAY_CACHE_KEEP_TTL under the fallback key, served only when
+    Ebay can't be called.
+
+    Parameters:
+        key (string): Cache key
+        response (dict): Ebay response
+        fallback_key (string): Key of the kept copy, keep_key(key) by default
+        ttl (int): Seconds the response is fresh, EBAY_CACHE_TTL by default
+
+    Returns:
+        dict: The stored response
+    """
+    ttl = ttl or dj_settings.EBAY_CACHE_TTL
+    fallback_key = fallback_key or keep_key(key)
+    entry = {'time': time.time(), 'data': response}
+    get_cache().set(key, entry, ttl + min(dj_settings.EBAY_CACHE_STALE_TTL, ttl))
+    get_cache().set(fallback_key, entry, dj_settings.EBAY_CACHE_KEEP_TTL)
+    return response
+
+def tag_key(tag):
+    return 'ebay:tag:%s' % tag
+
+def tag_version(tags):
+    """
+    Get the combined version of tags, folded into the keys of the entries
+    built from the tagged catalog data. Tags get a random version when they
+    have none, so entries built before a version was evicted are never
+    found again.
+
+    Parameters:
+        tags ([string]): Tags such as 'product:<id>'
+
+    Returns:
+        string: Version of the tags, None without tags
+    """
+    if not tags:
+        return None
+    keys = [tag_key(tag) for tag in tags]
+    versions = get_cache().get_many(keys)
+    for key in keys:
+        if key not in versions:
+            get_cache().add(key, uuid.uuid4().hex, None)
+            versions[key] = get_cache().get(key)
+    data = '|'.join('%s=%s' % (key, versions[key]) for key in keys)
+    return hashlib.sha1(data.encode()).hexdigest()
+
+def purge_tags(tags):
+    """
+    Give tags new versions, so the entries built from the tagged catalog
+    data are never found again. They expire on their own.
+
+    Parameters:
+        tags ([string]): Tags such as 'product:<id>'
+    """
+    if tags:
+        get_cache().set_many(
+            {tag_key(tag): uuid.uuid4().hex for tag in set(tags)}, None
+        )
+
+def response_time(response):
+    """
+    Get the time Ebay answered a response from its timestamp
+
+    Returns:
+        float: Response time, or the current time without a timestamp
+    """
+    try:
+        answered = datetime.strptime(response['timestamp'], '%Y-%m-%dT%H:%M:%S.%fZ')
+    except (KeyError, ValueError):
+        return time.time()
+    return answered.replace(tzinfo=timezone.utc).timestamp()
+
+def set_derived(key, data, answered, ttl=None):
+    """
+    Store data built from an Ebay response under the time Ebay answered the
+    response. The entry expires when the response goes stale, so it is never
+    served after the data it was built from.
+
+    Parameters:
+        key (string): Cache key
+        data: Data built from the response
+        answered (float): Time from response_time
+        ttl (int): Seconds the response is fresh, EBAY_CACHE_TTL by default
+
+    Returns:
+        bool: Whether the data was stored
+    """
+    remaining = (ttl or dj_settings.EBAY_CACHE_TTL) - (time.time() - answered)
+    if remaining <= 0:
+        return False
+    get_cache().set(key, {'time': answered, 'data': data}, remaining)
+    return True
+
+def remember_error(key, error):
+    """
+    Cache an upstream error so the key is not fetched again by every request
+    while Ebay keeps failing it: outages for EBAY_NEGATIVE_TTL, as the
+    circuit breaker handles them, and errors Ebay answered for the request
+    for EBAY_ANSWERED_ERROR_TTL, as Ebay answers the same request the same
+    way
+    """
+    timeout = (
+        dj_settings.EBAY_NEGATIVE_TTL if error.outage
+        else dj_settings.EBAY_ANSWERED_ERROR_TTL
+    )
+    get_cache().set('error:%s' % key, {
+        'method': error.method, 'message': str(error),
+        'response': error.response, 'outage': error.outage,
+    }, timeout)
+
+def recall_error(key):
+    """
+    Returns:
+        UpstreamError: Recently cached error of the key or None
+    """
+    error = get_cache().get('error:%s' % key)
+    return UpstreamError(**error) if error else None
+
+def store(key, fetcher, fallback_key=None, ttl=None):
+    """
+    Call the fetcher and store its response, caching upstream errors
+
+    Returns:
+        dict: The fetched response
+    """
+    try:
+        response = fetcher()
+    except UpstreamError as error:
+        remember_error(key, error)
+        raise
+    return set_entry(key, response, fallback_key, ttl)
+
+def is_servable(age, ttl=None):
+    """
+    Check an entry is fresh or within its stale window, which is never
+    longer than the entry is fresh
+
+    Parameters:
+        age (float): Entry age in seconds
+        ttl (int): Seconds the entry is fresh, EBAY_CACHE_TTL by default
+
+    Returns:
+        bool: Whether an entry of this age can be served
+    """
+    ttl = ttl or dj_settings.EBAY_CACHE_TTL
+    return age < ttl + min(dj_settings.EBAY_CACHE_STALE_TTL, ttl)
+
+def fallback(key, response, error, fallback_key=None):
+    """
+    Serve the cached response when Ebay can't be called, or else the copy
+    of the last good response kept under the fallback key
+
+    Parameters:
+        key (string): Cache key
+        response (dict): Cached response or None
+        error (Unavailable): Reason Ebay was not called
+        fallback_key (string): Key of the kept copy, keep_key(key) by default
+
+    Returns:
+        dict: The cached response, marked as degraded
+
+    Raises:
+        Unavailable: There is no cached response
+    """
+    if response is None:
+        response, age = get_entry(fallback_key or keep_key(key))
+    if response is None:
+        raise error
+    if error.method:
+        count(error.method, 'degraded')
+    return dict(response, degraded=True)
+
+def acquire_lock(key):
+    """
+    Try to take the single-flight lock for a key. The lock lives in the
+    shared tier of the ebay cache so it is shared by every worker process,
+    which the ebay.W001 check makes sure of.
+
+    Returns:
+        string: Lock token if acquired or None
+    """
+    token = uuid.uuid4().hex
+    if get_cache().add('lock:%s' % key, token, dj_settings.EBAY_CACHE_LOCK_TIMEOUT):
+        return token
+    return None
+
+def release_lock(key, token):
+    """
+    Release a single-flight lock if it is still held by the token
+    """
+    lock_key = 'lock:%s' % key
+    if get_cache().get(lock_key) == token:
+        get_cache().delete(lock_key)
+
+def poll(key, ttl):
+    """
+    Check on a key another caller holds the lock of while waiting for its
+    response
+
+    Parameters:
+        key (string): Cache key
+        ttl (int): Seconds the response is fresh
+
+    Returns:
+        (dict, string): The response once stored and servable, or a lock
+            token once the lock was released without a response
+
+    Raises:
+        UpstreamError: The other caller's fetch failed
+    """
+    waited, age = get_entry(key)
+    if waited is not None and is_servable(age, ttl):
+        return waited, None
+    error = recall_error(key)
+    if error:
+        raise error
+    if get_cache().get('lock:%s' % key) is None:
+        return None, acquire_lock(key)
+    return None, None
+
+def waiting_timed_out(key):
+    """
+    Returns:
+        Unavailable: Error raised when the caller fetching a key did not
+            answer within EBAY_CACHE_LOCK_WAIT
+    """
+    return Unavailable(None, 'Timed out waiting for the response of %s' % key)
+
+def refresh(key, fetcher, token, fallback_key=None, ttl=None):
+    """
+    Fetch and store a new response while holding the key's lock
+    """
+    try:
+        return store(key, fetcher, fallback_key, ttl)
+    finally:
+        release_lock(key, token)
+
+def refresh_in_background(key, fetcher, fallback_key=None, ttl=None):
+    """
+    Refresh a stale entry on a background worker unless another caller is
+    already refreshing it or the key recently failed
+    """
+    if recall_error(key):
+        return
+    token = acquire_lock(key)
+    if token:
+        future = refresher.submit(
+            refresh, key, fetcher, token, fallback_key, ttl
+        )
+        future.add_done_callback(log_refresh_error)
+
+def log_refresh_error(future):
+    """
+    Log a failed background refresh. The stale entry stays in place.
+    """
+    if future.exception():
+        logger.warning('Ebay cache refresh failed: %s', future.exception())
+
+def fetch(key, fetcher, fallback_key=None, ttl=None):
+    """
+    Get a response from the cache, calling the fetcher at most once across
+    concurrent callers when the entry is missing or expired.
+
+    Fresh entries are returned directly. Entries within the stale window are
+    returned immediately while a background refresh runs. Otherwise one
+    caller takes the key's lock and fetches while others wait for its result.
+    Waiters stop waiting as soon as the fetch failed, and one of them takes
+    over when the lock is released without a result. Waiters never fetch
+    without the lock, so they are served like Ebay was unavailable when the
+    wait times out. Keys whose fetch failed within EBAY_NEGATIVE_TTL are not
+    fetched again. When the fetcher raises Unavailable the copy of the last
+    good response kept under the fallback key is served.
+
+    Parameters:
+        key (string): Cache key
+        fetcher (callable): Function returning a new response
+        fallback_key (string): Key of the copy kept of every response
+            fetched, keep_key(key) by default
+        ttl (int): Seconds the response is fresh, EBAY_CACHE_TTL by default
+
+    Returns:
+        dict: Ebay response
+    """
+    ttl = ttl or dj_settings.EBAY_CACHE_TTL
+    response, age = get_entry(key)
+    record_lookup(lookup_outcome(response, age, ttl))
+
+    if response is not None and is_servable(age, ttl):
+        if age >= ttl:
+            refresh_in_background(key, fetcher, fallback_key, ttl)
+        return response
+
+    try:
+        error = recall_error(key)
+        if error:
+            raise error
+
+        token = acquire_lock(key)
+        if token:
+            return refresh(key, fetcher, token, fallback_key, ttl)
+
+        deadline = time.time() + dj_settings.EBAY_CACHE_LOCK_WAIT
+        while time.time() < deadline:
+            time.sleep(0.05)
+            waited, token = poll(key, ttl)
+            if waited is not None:
+                return waited
+            if token:
+                return refresh(key, fetcher, token, fallback_key, ttl)
+
+        raise waiting_timed_out(key)
+    except Unavailable as error:
+        return fallback(key, response, error, fallback_key)
+
+async def afetch(key, afetcher, fetcher, fallback_key=None, ttl=None):
+    """
+    Asynchronous version of fetch. Cache operations run in worker threads so
+    the event loop is never blocked.
+
+    Parameters:
+        key (string): Cache key
+        afetcher (callable): Coroutine function returning a new response
+        fetcher (callable): Function returning a new response, used for
+            background refreshes that may outlive the event loop
+        fallback_key (string): Key of the copy kept of every response
+            fetched, keep_key(key) by default
+        ttl (int): Seconds the response is fresh, EBAY_CACHE_TTL by default
+
+    Returns:
+        dict: Ebay response
+    """
+    ttl = ttl or dj_settings.EBAY_CACHE_TTL
+    response, age = await sync_to_async(get_entry, thread_sensitive=False)(key)
+    record_lookup(lookup_outcome(response, age, ttl))
+
+    if response is not None and is_servable(age, ttl):
+        if age >= ttl:
+            await sync_to_async(refresh_in_background, thread_sensitive=False)(
+                key, fetcher, fallback_key, ttl
+            )
+        return response
+
+    async def astore():
+        try:
+            fetched = await afetcher()
+        except UpstreamError as error:
+            await sync_to_async(remember_error, thread_sensitive=False)(key, error)
+            raise
+        return await sync_to_async(set_entry, thread_sensitive=False)(
+            key, fetched, fallback_key, ttl
+        )
+
+    try:
+        error = await sync_to_async(recall_error, thread_sensitive=False)(key)
+        if error:
+            raise error
+
+        token = await sync_to_async(acquire_lock, thread_sensitive=False)(key)
+        if token:
+            try:
+                return await astore()
+            finally:
+                await sync_to_async(release_lock, thread_sensitive=False)(
+                    key, token
+                )
+
+        deadline = time.time() + dj_settings.EBAY_CACHE_LOCK_WAIT
+        while time.time() < deadline:
+            await asyncio.sleep(0.05)
+            waited, token = await sync_to_async(poll, thread_sensitive=False)(
+                key, ttl
+            )
+            if waited is not None:
+                return waited
+            if token:
+                try:
+                    return await astore()
+                finally:
+                    await sync_to_async(release_lock, thread_sensitive=False)(
+                        key, token
+                    )
+
+        raise waiting_timed_out(key)
+    except Unavailable as error:
+        return await sync_to_async(fallback, thread_sensitive=False)(
+            key, response, error, fallback_key
+        )
+
+def warm(key, fetcher, margin, ttl=None):
+    """
+    Fetch a response ahead of its expiry for the cache warmer. Entries that
+    stay fresh for more than margin seconds are left alone, and keys being
+    fetched by another caller are skipped.
+
+    Parameters:
+        key (string): Cache key
+        fetcher (callable): Function returning a new response
+        margin (int): Seconds before going stale that an entry is refreshed
+        ttl (int): Seconds the entry is fresh, EBAY_CACHE_TTL by default
+
+    Returns:
+        (string, dict): 'hit', 'miss', 'refresh' or 'busy', and the cached
+            or fetched response, which is None when busy with no entry
+    """
+    response, age = get_entry(key)
+    if response is not None and age < (ttl or dj_settings.EBAY_CACHE_TTL) - margin:
+        return 'hit', response
+
+    token = acquire_lock(key)
+    if not token:
+        return 'busy', response
+
+    outcome = 'miss' if response is None else 'refresh'
+    return outcome, refresh(key, fetcher, token, ttl=ttl)
@@ -0,0 +1,19 @@
+from django.core import checks
+
+from core.cache import is_shared
+
+@checks.register(checks.Tags.caches)
+def check_shared_locks(app_configs, **kwargs):
+    """
+    Warn when the single-flight locks of Ebay refreshes are kept per
+    process, so every worker process calls Ebay for the same entry
+    """
+    if is_shared('ebay'):
+        return []
+    return [checks.Warning(
+        'The ebay cache keeps its refresh locks in a backend that is not '
+        'shared between worker processes.',
+        hint='Use a backend shared by every worker, such as '
+             'core.cache.SQLiteCache on one machine or Redis across machines.',
+        id='ebay.W001',
+    )]
@@ -0,0 +1,34 @@
+class Unavailable(Exception):
+    """
+    Raised instead of an Ebay response when Ebay can't be called or the call
+    fails, so cached responses of any age are served in its place
+
+    Attributes:
+        method (string): Ebay API search type, None when the response was
+            awaited from another caller
+        response (dict): Ebay error response, if Ebay answered
+    """
+
+    def __init__(self, method, message, response=None):
+        super(Unavailable, self).__init__(message)
+        self.method = method
+        self.response = response
+
+class RateLimited(Unavailable):
+    pass
+
+class CircuitOpen(Unavailable):
+    pass
+
+class UpstreamError(Unavailable):
+    """
+    Raised when an Ebay call fails or times out
+
+    Attributes:
+        outage (bool): Whether the failure is counted by the circuit breaker
+            rather than being an error answered for this request
+    """
+
+    def __init__(self, method, message, response=None, outage=True):
+        super(UpstreamError, self).__init__(method, message, response)
+        self.outage = outage
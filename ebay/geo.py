@@ -0,0 +1,84 @@
+import logging
+from threading import Lock
+from functools import lru_cache
+
+from django.conf import settings as dj_settings
+from django.contrib.gis.geoip2 import GeoIP2, GeoIP2Exception
+from geoip2.errors import AddressNotFoundError
+
+logger = logging.getLogger(__name__)
+
+reader = None
+reader_lock = Lock()
+
+def get_reader():
+    """
+    Get the process-wide GeoIP2 reader, opening the database on first use.
+    The database is memory mapped, so its pages are shared through the OS
+    page cache by every worker on the machine.
+
+    Returns:
+        GeoIP2: GeoIP2 reader or None if the database is unavailable
+    """
+    global reader
+    if reader is None:
+        with reader_lock:
+            if reader is None:
+                try:
+                    reader = GeoIP2(cache=GeoIP2.MODE_AUTO)
+                except GeoIP2Exception as error:
+                    logger.warning('GeoIP database unavailable: %s', error)
+                    reader = False
+    return reader or None
+
+@lru_cache(maxsize=dj_settings.GEOIP_CACHE_SIZE)
+def postal_code(ip_address):
+    """
+    Get the postal code of an IP address
+
+    Parameters:
+        ip_address (string): IP Address
+
+    Returns:
+        string: Postal code or None if it is unknown
+    """
+    geoip = get_reader()
+    if not geoip or not ip_address:
+        return None
+    try:
+        return geoip.city(ip_address)['postal_code']
+    except (AddressNotFoundError, ValueError):
+        return None
+
+def bucket_postal_code(zipcode, policy=None):
+    """
+    Generalize a postal code so buyers in the same area send the same value
+    to Ebay. The 'prefix' policy keeps the 3-digit ZIP prefix and sends the
+    area's representative code ending in 01, 'none' drops the postal code
+    and 'exact' keeps it unchanged.
+
+    Parameters:
+        zipcode (string): Postal code
+        policy (string): Bucketing policy, GEOIP_POSTAL_BUCKET by default
+
+    Returns:
+        string: Bucketed postal code or None
+    """
+    policy = policy or dj_settings.GEOIP_POSTAL_BUCKET
+    if not zipcode or policy == 'none':
+        return None
+    if policy == 'prefix' and len(zipcode) >= 3 and zipcode[:3].isdigit():
+        return zipcode[:3] + '01'
+    return zipcode
+
+def buyer_postal_code(ip_address):
+    """
+    Get the bucketed postal code sent to Ebay for an IP address
+
+    Parameters:
+        ip_address (string): IP Address
+
+    Returns:
+        string: Bucketed postal code or None
+    """
+    return bucket_postal_code(postal_code(ip_address))
@@ -1,21 +1,62 @@
 import os
-import re
-import json
-from datetime import datetime
+import asyncio
+import contextvars
+from decimal import Decimal, InvalidOperation
+from threading import BoundedSemaphore
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
 import bleach
+import aiohttp
+from asgiref.sync import sync_to_async
+from requests.exceptions import RequestException
 
 from django.conf import settings as dj_settings
-from django.db.models import Q
-from django.contrib.gis.geoip2 import GeoIP2
-from geoip2.errors import AddressNotFoundError
+from django.db.models import Count, F, Min
+from django.utils import timezone
 
 from ebaysdk.finding import Connection as Finding
 from ebaysdk.shopping import Connection as Shopping
-from ebaysdk.exception import ConnectionError as EbayError
-
-from products.models import Product
-from refinements.models import Aspect, Filter
+from ebaysdk.exception import EbaySDKError as EbayError
+
+from core.metrics import phase
+from products.catalog import get_catalog
+from refinements.index import get_index
+
+from . import aio, breaker, pool, quota
+from .geo import buyer_postal_code
+from .cache import (
+    afetch, fetch, get_entry, keep_key, make_key, record_lookup,
+    response_time, set_derived, tag_version
+)
+from .errors import Unavailable, UpstreamError
+from .listings import (
+    CONDITION_GROUPS, CURRENT_PRICE_SORTS, Listing, add_details, as_list,
+    parse_listings
+)
+from .models import StoredListing
+from .syncs import get_syncs
+
+# Workers running Shopping API calls alongside parsing, and a separate bounded
+# pool prefetching next pages so prefetches never delay a request
+pipeline = ThreadPoolExecutor(max_workers=dj_settings.EBAY_PIPELINE_WORKERS)
+prefetcher = ThreadPoolExecutor(max_workers=dj_settings.EBAY_PREFETCH_WORKERS)
+prefetch_slots = BoundedSemaphore(dj_settings.EBAY_PREFETCH_WORKERS)
+
+# Highest price limit accepted, the largest price the listing store holds
+MAX_PRICE = Decimal('99999999.99')
+
+# Finding API item filters the local listing store applies itself
+STORE_FILTERS = frozenset(['Condition', 'ListingType', 'MaxPrice', 'MinPrice'])
+
+# Ordering of stored listings per sort order, each backed by an index
+STORE_ORDER = {
+    'best': ['rank'],
+    'price': ['sort_price', 'rank'],
+    '-price': ['-sort_price', 'rank'],
+    'time': ['ends', 'rank'],
+    '-time': [F('started').desc(nulls_last=True), 'rank'],
+}
 
 class ItemResponse:
     """
@@ -24,8 +65,16 @@ class ItemResponse:
     Attributes:
         request (HttpRequest): Current HTTP Request object
         product (Product): Current product object
+        pages (int): Number of pages returned, starting at the requested one
+        ttl (int): Seconds the Ebay responses of the request are fresh
+        tags ([string]): Tags of the catalog data the request is built from
+        tag_version (string): Version of the tags, folded into the keys of
+            the request's cache entries
     """
 
+    # Listings shown per page
+    page_size = 20
+
     app_id = os.environ.get('EBAY_APPID')
     sort_by = {
         'best': ['BestMatch', ['Auction', 'AuctionWithBIN', 'FixedPrice']],
@@ -35,7 +84,7 @@ class ItemResponse:
         '-time': ['StartTimeNewest', ['AuctionWithBIN', 'FixedPrice']],
     }
 
-    def __init__(self, request, product):
+    def __init__(self, request, product, pages=1):
         self.request = request
         self.product = product
 
@@ -50,18 +99,96 @@ class ItemResponse:
         keywords = self.request.GET.get('keywords', None)
         self.keywords = bleach.clean(keywords, strip=True) if keywords else None
 
-        models = self.request.GET.getlist('model')
-        self.models = Product.objects.filter(slug__in=models)
+        selected = self.request.GET.getlist('condition')
+        self.conditions = [name for name in CONDITION_GROUPS if name in selected]
+        self.min_price = self.get_price('min_price')
+        self.max_price = self.get_price('max_price')
+
+        # Get precompiled refinements of the product and the items used to
+        # narrow down products shown
+        with phase('refinements'):
+            self.index = get_index(self.product)
+            self.models = self.index.get_models(self.request.GET.getlist('model'))
+            self.filters = self.get_filters()
+            self.queries = self.get_query()
+            self.aspects = self.get_aspects()
 
         try:
-            self.page = int(self.request.GET.get('page', 1))
+            self.page = max(int(self.request.GET.get('page', 1)), 1)
         except ValueError:
             self.page = 1
 
-        # Get items used to narrow down products shown
-        self.filters = self.get_filters()
-        self.queries = self.get_query()
-        self.aspects = self.get_aspects()
+        # Pages returned together must come from the same window
+        window_end = self.window(self.page) * self.window_size() // self.page_size
+        self.pages = max(min(pages, dj_settings.EBAY_MAX_PAGES, window_end - self.page + 1), 1)
+
+        self.ttl = self.cache_ttl()
+        self.tags = self.cache_tags()
+        self.tag_version = tag_version(self.tags)
+
+    def cache_ttl(self):
+        """
+        Get how long the Ebay responses of the request stay fresh. Listings
+        ending soonest change quickly, while fixed price listings sorted by
+        price or start time hardly change. The nearest category of the
+        product, or of its ancestors, with an override in
+        EBAY_CATEGORY_CACHE_TTLS wins over the sort order's TTL in
+        EBAY_CACHE_TTLS.
+
+        Returns:
+            int: Seconds the responses are fresh
+        """
+        overrides = dj_settings.EBAY_CATEGORY_CACHE_TTLS
+        if overrides:
+            categories = get_catalog().categories
+            category = categories.by_id.get(self.product.category_id)
+            if category is not None:
+                for each in reversed(categories.ancestors(category, include_self=True)):
+                    ttl = overrides.get(each.slug)
+                    if isinstance(ttl, dict):
+                        ttl = ttl.get(self.sort)
+                    if ttl:
+                        return ttl
+        return dj_settings.EBAY_CACHE_TTLS.get(self.sort, dj_settings.EBAY_CACHE_TTL)
+
+    def cache_tags(self):
+        """
+        Get the tags of the cache entries built for the request, so editing
+        the catalog data a search was built from versions them out: the product
+        and its ancestors, whose aspects refine its searches, the selected
+        models and filters, and the category
+
+        Returns:
+            [string]: Tags such as 'product:<id>'
+        """
+        products = get_catalog().products
+        product = products.by_id.get(self.product.id)
+        nodes = products.ancestors(product, include_self=True) if product else []
+        for slug in dict.fromkeys(self.request.GET.getlist('model')):
+            model = products.get(slug)
+            if model is not None and slug in self.index.model_lookup:
+                nodes.append(model)
+
+        tags = ['product:%d' % node.id for node in nodes] or [
+            'product:%d' % self.product.id
+        ]
+        tags.extend('filter:%d' % each_filter.id for each_filter in self.filters)
+        tags.append('category:%d' % self.product.category_id)
+        return tags
+
+    def get_price(self, name):
+        """
+        Returns:
+            Decimal: Price limit of a request parameter, None if missing or
+                not an amount between 0 and MAX_PRICE
+        """
+        try:
+            price = Decimal(self.request.GET.get(name, ''))
+        except InvalidOperation:
+            return None
+        if not price.is_finite() or price < 0 or price > MAX_PRICE:
+            return None
+        return price.quantize(Decimal('0.01'))
 
     def get_filters(self):
         """
@@ -69,15 +196,9 @@ class ItemResponse:
         returned products
 
         Returns:
-            QuerySet: List of filters
+            [Filter]: List of filters
         """
-        keys = list(dict(self.request.GET).keys())
-        vals = [v for l in list(dict(self.request.GET).values()) for v in l]
-        filters = Filter.objects.filter(
-            Q(product__in=self.product.get_family()) & Q(group__slug__in=keys) &
-            Q(slug__in=vals)
-        )
-        return filters
+        return self.index.get_filters(self.request.GET)
 
     def get_query(self):
         """
@@ -87,35 +208,16 @@ class ItemResponse:
         Returns:
             [string]: List of query strings
         """
-        queries = [self.product.query] if self.product.query else []
-        queries.extend([model.query for model in self.models if model.query])
-        query_dict = {}
-        for each_filter in list(self.filters.exclude(query='').values('group', 'query')):
-            query_dict.setdefault(each_filter['group'], []).append(each_filter['query'])
-        for query in list(query_dict.values()):
-            queries.append('(%s)' % ','.join(query) if len(query) > 1 else query[0])
-        if self.keywords:
-            queries.append(self.keywords)
-        return queries
+        return self.index.get_query(self.models, self.filters, self.keywords)
 
     def get_aspects(self):
         """
         Get a list of applicable filter values related to the list of filters
 
         Returns:
-            QuerySet: List of aspect objects
+            [dict]: List of aspectFilter entries
         """
-        aspect_set = Aspect.objects.filter(
-            Q(product__in=self.product.get_ancestors(include_self=True)) |
-            Q(product__in=self.models) | Q(filter__in=self.filters)
-        )
-        aspects = []
-        for aspect in aspect_set:
-            val = aspect.value.split('|')
-            if not self.strict and not aspect.is_strict:
-                val.append('Not Specified')
-            aspects.append({'aspectName': aspect.name, 'aspectValueName': val})
-        return aspects
+        return self.index.get_aspects(self.models, self.filters, self.strict)
 
     def get_client_ip(self):
         """
@@ -131,9 +233,31 @@ class ItemResponse:
             ip_address = self.request.META.get('REMOTE_ADDR')
         return ip_address
 
-    def find_settings(self):
+    def window_size(self):
+        """
+        Get the number of Finding API entries fetched per call, a multiple of
+        the page size between one page and Ebay's limit of 100
+
+        Returns:
+            int: Entries per window
+        """
+        size = dj_settings.EBAY_WINDOW_SIZE // self.page_size * self.page_size
+        return min(max(size, self.page_size), 100)
+
+    def window(self, page):
+        """
+        Returns:
+            int: Number of the Finding API window holding a page
+        """
+        return (page - 1) * self.page_size // self.window_size() + 1
+
+    def find_settings(self, page=None):
         """
-        Get the settings used within the Ebay Finding API
+        Get the settings used within the Ebay Finding API for the window
+        holding a page
+
+        Parameters:
+            page (int): Page number, the requested page by default
 
         Returns:
             dict: A dictionary of setting keys and values
@@ -143,8 +267,8 @@ class ItemResponse:
             'aspectFilter': self.aspects,
             'itemFilter': [
                 {'name': 'Condition', 'value': [
-                    '1000', '1500', '2000', '2500', '3000', '4000', '5000',
-                    '6000'
+                    condition_id for name in self.conditions or CONDITION_GROUPS
+                    for condition_id in CONDITION_GROUPS[name][1]
                 ]},
                 {'name': 'FeedbackScoreMin', 'value': 10},
                 {'name': 'HideDuplicateItems', 'value': 'true'},
@@ -154,25 +278,175 @@ class ItemResponse:
             ],
             'outputSelector': ['SellerInfo'],
             'affiliate': {'networkId': '9', 'trackingId': '5338417073'},
-            'paginationInput': {'entriesPerPage':  20, 'pageNumber': self.page},
+            'paginationInput': {
+                'entriesPerPage': self.window_size(),
+                'pageNumber': self.window(page or self.page),
+            },
             'sortOrder': self.sort_by[self.sort][0],
         }
 
+        for name, price in [('MinPrice', self.min_price), ('MaxPrice', self.max_price)]:
+            if price is not None:
+                find_settings['itemFilter'].append({
+                    'name': name, 'value': '%.2f' % price,
+                    'paramName': 'Currency', 'paramValue': 'USD',
+                })
+
         if self.queries:
             find_settings['keywords'] = ' '.join(self.queries)
             find_settings['descriptionSearch'] = 'true'
 
-        try:
-            zipcode = GeoIP2().city(self.get_client_ip())['postal_code']
+        with phase('geoip'):
+            zipcode = buyer_postal_code(self.get_client_ip())
+        if zipcode:
             find_settings['buyerPostalCode'] = zipcode
-        except AddressNotFoundError:
-            pass
 
         return find_settings
 
-    def call_ebay(self, api, method, settings):
+    def store_key(self, find_settings):
+        """
+        Get the key of the search a request narrows, which the local listing
+        store must hold to answer it: its Finding API settings without the
+        sort order, listing types, conditions and price limits applied by
+        the store, pagination and the buyer postal code
+
+        Parameters:
+            find_settings (dict): Finding API settings of the request
+
+        Returns:
+            string: Search key
+        """
+        search = {
+            name: value for name, value in find_settings.items()
+            if name not in ('paginationInput', 'sortOrder', 'buyerPostalCode')
+        }
+        search['itemFilter'] = [
+            item_filter for item_filter in find_settings['itemFilter']
+            if item_filter['name'] not in STORE_FILTERS
+        ]
+        return make_key('store', search)
+
+    def local_items(self, find_settings):
         """
-        Set the name of cached file, and return Ebay data response.
+        Get the requested pages from the local listing store with indexed
+        queries. The store answers when the product's listings were synced
+        within EBAY_STORE_TTL, every listing of its search is stored, and
+        the request narrows that search by sort order, condition or price
+        only. Syncs are checked in a snapshot, so products the store can't
+        answer cost no query. Ended listings are left out, and the version
+        of the listings includes the time the next one ends, so cached
+        fragments and entity tags change when it does. Shipping costs are
+        those of the sync, made without a buyer postal code.
+
+        Parameters:
+            find_settings (dict): Finding API settings of the request
+
+        Returns:
+            dict: Item count and listings, or None when Ebay must be called
+        """
+        with phase('store'):
+            sync = get_syncs().get(self.product.id)
+            if sync is None:
+                return None
+            search, synced, complete = sync
+            now = timezone.now()
+            if (
+                not complete or search != self.store_key(find_settings) or
+                (now - synced).total_seconds() > dj_settings.EBAY_STORE_TTL
+            ):
+                return None
+
+            listings = StoredListing.objects.filter(
+                product_id=self.product.id,
+                listing_type__in=self.sort_by[self.sort][1],
+                ends__gt=now,
+            )
+            if self.conditions:
+                listings = listings.filter(condition__in=[
+                    CONDITION_GROUPS[name][0] for name in self.conditions
+                ])
+            if self.min_price is not None:
+                listings = listings.filter(price__gte=self.min_price)
+            if self.max_price is not None:
+                listings = listings.filter(price__lte=self.max_price)
+
+            start = (self.page - 1) * self.page_size
+            current_price = self.sort in CURRENT_PRICE_SORTS
+            found = listings.aggregate(count=Count('pk'), next_end=Min('ends'))
+            items = {
+                'count': found['count'],
+                'list': [
+                    listing.to_listing(current_price) for listing in
+                    listings.order_by(*STORE_ORDER[self.sort])[
+                        start:start + self.pages * self.page_size
+                    ]
+                ],
+            }
+
+        key = make_key('stored', dict(
+            find_settings, page=self.page, pages=self.pages, format=Listing.format
+        ))
+        next_end = found['next_end'].timestamp() if found['next_end'] else 0
+        items['version'] = '%s@%.6f@%d' % (key, synced.timestamp(), next_end)
+        return items
+
+    def connect(self, api, pooled=True):
+        """
+        Get an Ebaysdk connection to the configured API domain. Pooled
+        connections are reused by the current thread with their keep-alive
+        HTTP connection. Asynchronous calls share the connection state
+        across tasks on one thread, so they use a new connection to build
+        and parse each request.
+
+        Parameters:
+            api: Ebaysdk connection method
+            pooled (bool): Whether to reuse the thread's connection
+
+        Returns:
+            Ebaysdk connection object
+        """
+        if api == Finding:
+            domain = dj_settings.EBAY_FINDING_DOMAIN
+        else:
+            domain = dj_settings.EBAY_SHOPPING_DOMAIN
+        if pooled:
+            return pool.get_connection(api, self.app_id, domain)
+        return pool.create_connection(api, self.app_id, domain)
+
+    def phase(self, api):
+        """
+        Returns:
+            string: Name under which calls to an API are timed
+        """
+        return 'finding' if api == Finding else 'shopping'
+
+    def upstream_error(self, method, error):
+        """
+        Convert a failed Ebay call into an UpstreamError and record it with
+        the circuit breaker. Errors Ebay answered for this request leave the
+        circuit closed, while timeouts, connection and server errors count
+        towards opening it.
+
+        Parameters:
+            method (string): Ebay API search type
+            error (Exception): Ebaysdk or transport error
+
+        Returns:
+            UpstreamError: Error raised in place of the response
+        """
+        response = getattr(error, 'response', None)
+        answered = response is not None and response.status_code == 200
+        if isinstance(error, EbayError) and answered:
+            breaker.succeeded(method)
+            return UpstreamError(method, str(error), response.dict(), outage=False)
+        breaker.failed(method)
+        return UpstreamError(method, '%s failed: %r' % (method, error))
+
+    def request_ebay(self, api, method, settings):
+        """
+        Call the Ebay API without using the cache. Calls are refused while
+        the method's circuit is open and counted against the shared rate
+        limit and daily quotas.
 
         Parameters:
             api: Ebaysdk connection method
@@ -181,137 +455,444 @@ class ItemResponse:
 
         Returns:
             dict: Ebay item data
+
+        Raises:
+            Unavailable: Ebay was not called or the call failed
         """
-        if api == Finding:
-            cache_name = 'cache/%s-%d-find.json' % (self.product.slug, self.page)
-        else:
-            cache_name = 'cache/%s-%d-shop.json' % (self.product.slug, self.page)
-        cache_path = os.path.join(dj_settings.BASE_DIR, cache_name)
-
-        response = check_cache(cache_path)
-
-        if not response:
-            try:
-                response = api(appid=self.app_id, https=True, config_file=None).execute(
-                    method, settings
-                ).dict()
-                cache_file = open(cache_path, 'w+')
-                cache_file.write(json.dumps(response))
-                cache_file.close()
-            except EbayError as error:
-                return error.response.dict()
+        breaker.check(method)
+        quota.take(method)
+        try:
+            with phase(self.phase(api)):
+                response = self.connect(api).execute(method, settings).dict()
+        except (EbayError, RequestException) as error:
+            raise self.upstream_error(method, error)
+        breaker.succeeded(method)
+        return response
+
+    async def arequest_ebay(self, session, api, method, settings):
+        """
+        Call the Ebay API asynchronously without using the cache
 
+        Parameters:
+            session (ClientSession): aiohttp client session
+            api: Ebaysdk connection method
+            method (string): Ebay API search type
+            settings (dict): Settings dictionary
+
+        Returns:
+            dict: Ebay item data
+
+        Raises:
+            Unavailable: Ebay was not called or the call failed
+        """
+        await sync_to_async(breaker.check, thread_sensitive=False)(method)
+        await sync_to_async(quota.take, thread_sensitive=False)(method)
+        try:
+            with phase(self.phase(api)):
+                response = await aio.execute(
+                    session, self.connect(api, pooled=False), method, settings
+                )
+        except (
+            EbayError, RequestException, aiohttp.ClientError, asyncio.TimeoutError
+        ) as error:
+            raise await sync_to_async(
+                self.upstream_error, thread_sensitive=False
+            )(method, error)
+        await sync_to_async(breaker.succeeded, thread_sensitive=False)(method)
         return response
 
-    def parse_data(self, items, item, details):
+    def call_ebay(self, api, method, settings, fallback_key=None, version=None):
         """
-        Extract important data from Ebay response
+        Return Ebay data response from the cache. Only one caller calls Ebay
+        when the entry is missing, and stale entries are served while they
+        are refreshed in the background. When Ebay can't be called or fails,
+        the copy of the last good response kept under the fallback key is
+        served.
 
         Parameters:
-            items (int): Total number of items returned
-            item (dict): Single ebay listing
-            details (dict): More listing information from by Ebay Shopping API
+            api: Ebaysdk connection method
+            method (string): Ebay API search type
+            settings (dict): Settings dictionary
+            fallback_key (string): Cache key of the kept copy of the
+                response, by default its own
+            version (string): Version of the tags of the catalog data the
+                settings were built from
+
+        Returns:
+            dict: Ebay item data
         """
-        buy_it_now = 'convertedBuyItNowPrice'
-        info = item['listingInfo']
+        try:
+            return fetch(
+                make_key(method, settings, version),
+                partial(self.request_ebay, api, method, settings), fallback_key,
+                self.ttl
+            )
+        except Unavailable as error:
+            return self.error_response(error)
+
+    async def acall_ebay(
+        self, session, api, method, settings, fallback_key=None, version=None
+    ):
+        """
+        Asynchronous version of call_ebay
 
-        if self.sort in ['best', 'time'] or buy_it_now not in info:
-            cur = item['sellingStatus']['convertedCurrentPrice']
-            price = "{0:.2f}".format(float(cur['value']))
-            auction_type = 'Auction' if 'Auction' in info['listingType'] else 'Fixed'
-        else:
-            price = "{0:.2f}".format(float(info[buy_it_now]['value']))
-            auction_type = 'Fixed/Auction'
+        Parameters:
+            session (ClientSession): aiohttp client session
+            api: Ebaysdk connection method
+            method (string): Ebay API search type
+            settings (dict): Settings dictionary
+            fallback_key (string): Cache key of the kept copy of the
+                response, by default its own
+            version (string): Version of the tags of the catalog data the
+                settings were built from
 
-        if 'shippingServiceCost' in item['shippingInfo']:
-            ship = item['shippingInfo']['shippingServiceCost']
-            shipping = '{0:.2f}'.format(float(ship['value']))
-            shipping = 'free' if shipping == '0.00' else shipping
-        else:
-            shipping = 'variable'
+        Returns:
+            dict: Ebay item data
+        """
+        try:
+            return await afetch(
+                make_key(method, settings, version),
+                partial(self.arequest_ebay, session, api, method, settings),
+                partial(self.request_ebay, api, method, settings), fallback_key,
+                self.ttl
+            )
+        except Unavailable as error:
+            return self.error_response(error)
+
+    def error_response(self, error):
+        """
+        Get the Ebay response of a failed call, or build a failed response
+        when Ebay was not called or did not answer
 
-        if item['condition']['conditionId'] in ['1000', '1500']:
-            condition = 'New'
-        elif item['condition']['conditionId'] in ['2000', '2500']:
-            condition = 'Refurb'
-        else:
-            condition = 'Used'
-
-        if details:
-            if 'ConditionDescription' in details:
-                text = details['ConditionDescription']
-            elif 'Description' in details and details['Description']:
-                text = details['Description']
-            else:
-                text = None
-            images = details['PictureURL'] if 'PictureURL' in details else None
-        else:
-            text = None
-            images = None
-        text = (text[:1000] + '...') if text and len(text) > 1000 else text
-
-        end = re.findall(r'[\d]+', item['sellingStatus']['timeLeft'])
-        end = '%sd %sh %sm %ss' % tuple(end)
-
-        items['list'].append({
-            'url': item['viewItemURL'], 'images': images, 'type': auction_type,
-            'title': item['title'], 'price': price, 'shipping': shipping,
-            'condition': condition, 'text': text, 'end': end,
-            'location': ', '.join(item['location'].split(',')[:2]),
-            'seller': {
-                'name': item['sellerInfo']['sellerUserName'][:20],
-                'percent': item['sellerInfo']['positiveFeedbackPercent'],
-                'ratings': item['sellerInfo']['feedbackScore']
-            }
+        Parameters:
+            error (Unavailable): Reason there is no response
+
+        Returns:
+            dict: Response with a Failure ack and error message
+        """
+        if error.response:
+            return error.response
+        return {'ack': 'Failure', 'errorMessage': {'error': {'message': str(error)}}}
+
+    def fallback_key(self, find_settings):
+        """
+        Get the cache key keeping the last good response of the request's
+        search from any buyer location, served when this request's response
+        is unavailable. It is the request's own window of the same search,
+        so neither other filters nor "Load More" pages are ever served in
+        its place.
+
+        Parameters:
+            find_settings (dict): Finding API settings of the request
+
+        Returns:
+            string: Cache key
+        """
+        return keep_key(make_key('findItemsAdvanced', {
+            name: value for name, value in find_settings.items()
+            if name != 'buyerPostalCode'
+        }, self.tag_version))
+
+    def page_find(self, find, find_settings, page):
+        """
+        Narrow a Finding API response for a window to the entries of a page
+
+        Parameters:
+            find (dict): Finding API response
+            find_settings (dict): Finding API settings of the window
+            page (int): Page number
+
+        Returns:
+            dict: Finding API response holding the page's entries only
+        """
+        pagination = find_settings['paginationInput']
+        start = (page - 1) * self.page_size - (
+            (pagination['pageNumber'] - 1) * pagination['entriesPerPage']
+        )
+        entries = as_list(find.get('searchResult', {}).get('item'))
+        return dict(find, searchResult={
+            'item': entries[start:start + self.page_size]
         })
 
+    def shop_settings(self, find):
+        """
+        Get the settings used within the Ebay Shopping API for the listings
+        of a page's Finding API response
+
+        Parameters:
+            find (dict): Finding API response of a page
+
+        Returns:
+            dict: A dictionary of setting keys and values, or None when the
+                page has no listings
+        """
+        ids = [i['itemId'] for i in as_list(find['searchResult']['item'])]
+        if not ids:
+            return None
+        return {'ItemID': ids, 'IncludeSelector': 'TextDescription'}
+
+    def items_key(self, find_settings, page):
+        """
+        Get the cache key of the listings built for a page
+
+        Parameters:
+            find_settings (dict): Finding API settings of the page's window
+            page (int): Page number
+
+        Returns:
+            string: Cache key
+        """
+        return make_key(
+            'items', dict(find_settings, page=page, format=Listing.format),
+            self.tag_version
+        )
+
+    def store_items(self, find_settings, page, items, find, shop=None):
+        """
+        Cache the listings built for a page until the Finding response they
+        were built from goes stale, and version them with the response time.
+        Listings built from degraded, stale or failed responses are neither
+        cached nor versioned and are built again next time.
+
+        Parameters:
+            find_settings (dict): Finding API settings of the page's window
+            page (int): Page number
+            items (dict): Item count and listings
+            find (dict): Finding API response
+            shop (dict): Shopping API response, if listings were found
+        """
+        if find.get('degraded'):
+            return
+        if shop is not None and (
+            shop.get('degraded') or shop.get('Ack') not in ('Success', 'Warning')
+        ):
+            return
+
+        key = self.items_key(find_settings, page)
+        answered = response_time(find)
+        items['version'] = '%s@%.6f' % (key, answered)
+        if not set_derived(key, items, answered, self.ttl):
+            del items['version']
+
+    def parse(self, find):
+        """
+        Returns:
+            [Listing]: Listings of a page's Finding API response
+        """
+        with phase('parse'):
+            return parse_listings(find, self.sort)
+
+    def build_pages(self, find_settings, find, pages):
+        """
+        Build and cache the listings of pages from their window's Finding API
+        response. The Shopping API calls of every page run in parallel while
+        the Finding API listings are parsed.
+
+        Parameters:
+            find_settings (dict): Finding API settings of the window
+            find (dict): Successful Finding API response
+            pages ([int]): Page numbers
+
+        Returns:
+            dict: Item count and listings per page number
+        """
+        count = int(find['paginationOutput']['totalEntries'])
+        finds = {page: self.page_find(find, find_settings, page) for page in pages}
+        shops = {}
+        for page in pages:
+            shop_settings = self.shop_settings(finds[page])
+            if shop_settings:
+                shops[page] = pipeline.submit(
+                    contextvars.copy_context().run, self.call_ebay, Shopping,
+                    'GetMultipleItems', shop_settings
+                )
+
+        built = {}
+        for page in pages:
+            items = {'count': count, 'list': self.parse(finds[page])}
+            shop = None
+            if page in shops:
+                shop = shops[page].result()
+                with phase('parse'):
+                    add_details(items['list'], shop)
+            self.store_items(find_settings, page, items, find, shop)
+            built[page] = items
+        return built
+
+    async def abuild_pages(self, session, find_settings, find, pages):
+        """
+        Asynchronous version of build_pages
+
+        Parameters:
+            session (ClientSession): aiohttp client session
+            find_settings (dict): Finding API settings of the window
+            find (dict): Successful Finding API response
+            pages ([int]): Page numbers
+
+        Returns:
+            dict: Item count and listings per page number
+        """
+        async def build(page):
+            page_find = self.page_find(find, find_settings, page)
+            items = {'count': count, 'list': []}
+            shop = None
+            shop_settings = self.shop_settings(page_find)
+            if shop_settings:
+                shop, items['list'] = await asyncio.gather(
+                    self.acall_ebay(
+                        session, Shopping, 'GetMultipleItems', shop_settings
+                    ),
+                    sync_to_async(self.parse, thread_sensitive=False)(page_find)
+                )
+                with phase('parse'):
+                    add_details(items['list'], shop)
+            await sync_to_async(self.store_items, thread_sensitive=False)(
+                find_settings, page, items, find, shop
+            )
+            return items
+
+        count = int(find['paginationOutput']['totalEntries'])
+        built = await asyncio.gather(*[build(page) for page in pages])
+        return dict(zip(pages, built))
+
+    def join_pages(self, pages):
+        """
+        Join the listings of consecutive pages into one response, versioned
+        only when every page is
+
+        Parameters:
+            pages ([dict]): Item count and listings of each page
+
+        Returns:
+            dict: Item count and listings
+        """
+        if len(pages) == 1:
+            return pages[0]
+        items = {
+            'count': pages[0]['count'],
+            'list': [listing for page in pages for listing in page['list']]
+        }
+        versions = [page.get('version') for page in pages]
+        if all(versions):
+            items['version'] = '|'.join(versions)
+        return items
+
+    def cached_pages(self, find_settings):
+        """
+        Get the cached listings of the requested pages
+
+        Returns:
+            dict: Item count and listings, or None, per page number
+        """
+        pages = {}
+        with phase('cache'):
+            for page in range(self.page, self.page + self.pages):
+                pages[page], age = get_entry(self.items_key(find_settings, page))
+                record_lookup('items:miss' if pages[page] is None else 'items:hit')
+        return pages
+
+    def fetch_page(self, page):
+        """
+        Build and cache the listings of a page unless they are cached already
+
+        Parameters:
+            page (int): Page number
+        """
+        find_settings = self.find_settings(page)
+        items, age = get_entry(self.items_key(find_settings, page))
+        if items is not None:
+            return
+        find = self.call_ebay(
+            Finding, 'findItemsAdvanced', find_settings,
+            version=self.tag_version
+        )
+        if find['ack'] == 'Success':
+            self.build_pages(find_settings, find, [page])
+
+    def prefetch(self, count):
+        """
+        Fetch the page following the returned ones in the background so a
+        following "Load More" request is served from the cache. Within a
+        window this costs a single Shopping API call. Prefetches are skipped
+        when every prefetch worker is busy.
+
+        Parameters:
+            count (int): Total number of items returned
+        """
+        page = self.page + self.pages
+        if not dj_settings.EBAY_PREFETCH or (page - 1) * self.page_size >= count:
+            return
+        if not prefetch_slots.acquire(blocking=False):
+            return
+
+        future = prefetcher.submit(self.fetch_page, page)
+        future.add_done_callback(lambda f: prefetch_slots.release())
+
     def get_items(self):
         """
-        Initiates Ebay pull request
+        Initiates Ebay pull request. Listings are served from the local
+        listing store when it holds the request's search. Otherwise listings
+        already built for the requested pages are served from the cache, or
+        they are built from the Finding API window holding them, and the
+        next page is prefetched.
 
         Returns:
             dict: Item information or error
         """
-        find = self.call_ebay(Finding, 'findItemsAdvanced', self.find_settings())
-        if find['ack'] == 'Success':
-            items = {
-                'count': int(find['paginationOutput']['totalEntries']),
-                'list': []
-            }
-            if items['count'] > 0:
-                ids = [i['itemId'] for i in find['searchResult']['item']]
-                shop_settings = {
-                    'ItemID': ids, 'IncludeSelector': 'TextDescription'
-                }
-                shop = self.call_ebay(Shopping, 'GetMultipleItems', shop_settings)
-                for item in find['searchResult']['item']:
-                    if items['count'] > 1:
-                        details = next(
-                            (i for i in shop['Item'] if i['ItemID'] == item['itemId']),
-                            None
-                        )
-                    else:
-                        details = shop['Item']
-                    self.parse_data(items, item, details)
+        find_settings = self.find_settings()
+        items = self.local_items(find_settings)
+        if items is not None:
             return items
-        return {'error': find['errorMessage']}
 
-def check_cache(path):
-    """
-    Check if a cached file exists. Get the file's update timestamp, and see
-    if the cached file has been updated in the last hour.
+        pages = self.cached_pages(find_settings)
+        missing = [page for page, items in pages.items() if items is None]
 
-    Returns:
-        dict: Cached response if less than an hour old or None
-    """
-    result = None
+        if missing:
+            find = self.call_ebay(
+                Finding, 'findItemsAdvanced', find_settings,
+                self.fallback_key(find_settings), self.tag_version
+            )
+            if find['ack'] != 'Success':
+                return {'error': find['errorMessage']}
+            pages.update(self.build_pages(find_settings, find, missing))
+
+        items = self.join_pages(list(pages.values()))
+        self.prefetch(items['count'])
+        return items
+
+    async def aget_items(self):
+        """
+        Asynchronous version of get_items. Ebay calls are made over the event
+        loop's shared asyncio HTTP session so the loop is free while they run
+        and connections are kept alive between requests.
 
-    if os.path.exists(path):
-        with open(path) as cache_file:
-            data = json.load(cache_file)
-            time_string = data["timestamp"] if "timestamp" in data else data["Timestamp"]
-            cache_time = datetime.strptime(time_string, "%Y-%m-%dT%H:%M:%S.%fZ")
-            if (datetime.utcnow() - cache_time).total_seconds() < 3600:
-                result = data
+        Returns:
+            dict: Item information or error
+        """
+        find_settings = await sync_to_async(
+            self.find_settings, thread_sensitive=False
+        )()
+        items = await sync_to_async(self.local_items)(find_settings)
+        if items is not None:
+            return items
 
-    return result
+        pages = await sync_to_async(self.cached_pages, thread_sensitive=False)(
+            find_settings
+        )
+        missing = [page for page, items in pages.items() if items is None]
+
+        if missing:
+            session = await aio.get_session()
+            find = await self.acall_ebay(
+                session, Finding, 'findItemsAdvanced', find_settings,
+                self.fallback_key(find_settings), self.tag_version
+            )
+            if find['ack'] != 'Success':
+                return {'error': find['errorMessage']}
+            pages.update(await self.abuild_pages(
+                session, find_settings, find, missing
+            ))
+
+        items = self.join_pages(list(pages.values()))
+        self.prefetch(items['count'])
+        return items
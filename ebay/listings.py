@@ -0,0 +1,240 @@
+import re
+import time
+from datetime import datetime, timezone
+
+from .cache import response_time
+
+BUY_IT_NOW = 'convertedBuyItNowPrice'
+CONDITIONS = {'1000': 'New', '1500': 'New', '2000': 'Refurb', '2500': 'Refurb'}
+
+# Conditions requests can be narrowed to: label and Ebay condition IDs
+CONDITION_GROUPS = {
+    'new': ('New', ['1000', '1500']),
+    'refurb': ('Refurb', ['2000', '2500']),
+    'used': ('Used', ['3000', '4000', '5000', '6000']),
+}
+TIME_LEFT = re.compile(r'\d+')
+END_TIME = '%Y-%m-%dT%H:%M:%S.%fZ'
+CURRENT_PRICE_SORTS = frozenset(['best', 'time'])
+
+# Ebay serves every picture in several sizes named by their longest side.
+# Galleries show 200px tall pictures, so they load the 300px size. Older
+# picture URLs name their size with a code after the picture ID, which also
+# serves the named sizes.
+PICTURE_SIZE = re.compile(r'/s-l\d+(\.\w+)(\?.*)?$')
+THUMBNAIL = r'/s-l300\1\2'
+PICTURE_CODE = re.compile(
+    r'^(https?://i\.ebayimg\.com)/.*/z/([^/?]+)/\$_\d+\.\w+(\?.*)?$'
+)
+CODE_THUMBNAIL = r'\1/images/g/\2/s-l300.jpg\3'
+
+class Listing:
+    """
+    Compact record of the listing fields shown in the results template
+
+    Attributes:
+        item_id (string): Ebay item ID
+        url (string): Ebay listing URL
+        title (string): Listing title
+        type (string): Auction, Fixed or Fixed/Auction
+        price (string): Formatted price
+        shipping (string): Formatted shipping cost, free or variable
+        condition (string): New, Refurb or Used
+        end (int): Time the listing ends, in seconds since the epoch
+        location (string): Seller location
+        seller_name (string): Seller user name
+        seller_percent (string): Seller positive feedback percentage
+        seller_ratings (string): Seller feedback score
+        text (string): Condition description or item description
+        images ([(string, string)]): Thumbnail and full size picture URLs
+    """
+
+    # Changed whenever the fields or their values change shape, so listings
+    # cached in an older format are not used
+    format = 4
+
+    __slots__ = (
+        'item_id', 'url', 'title', 'type', 'price', 'shipping', 'condition',
+        'end', 'location', 'seller_name', 'seller_percent', 'seller_ratings',
+        'text', 'images',
+    )
+
+    def __init__(self, **kwargs):
+        self.text = None
+        self.images = None
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+
+    def __getstate__(self):
+        # Pickled as a tuple of values so cached pages don't repeat field names
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+def as_list(value):
+    """
+    Ebay responses hold a single element instead of a list when there is only
+    one result, so wrap it in a list
+
+    Returns:
+        list: List of response elements
+    """
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def end_time(item, answered):
+    """
+    Get the time a listing ends from its end time, or from the time left
+    when the response was answered
+
+    Parameters:
+        item (dict): Finding API item
+        answered (float): Time from response_time
+
+    Returns:
+        int: End time in seconds since the epoch
+    """
+    try:
+        end = datetime.strptime(item['listingInfo']['endTime'], END_TIME)
+    except (KeyError, ValueError):
+        days, hours, minutes, seconds = map(
+            int, TIME_LEFT.findall(item['sellingStatus']['timeLeft'])
+        )
+        return int(answered + ((days * 24 + hours) * 60 + minutes) * 60 + seconds)
+    return int(end.replace(tzinfo=timezone.utc).timestamp())
+
+def time_left(end, now=None):
+    """
+    Format the time left before a listing ends
+
+    Parameters:
+        end (int): End time from end_time
+        now (float): Current time by default
+
+    Returns:
+        string: Days, hours, minutes and seconds left, or None once ended
+    """
+    left = int(end - (time.time() if now is None else now))
+    if left <= 0:
+        return None
+    minutes, seconds = divmod(left, 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    return '%dd %dh %dm %ds' % (days, hours, minutes, seconds)
+
+def parse_listings(find, sort):
+    """
+    Extract the fields shown for every listing of a Finding API response
+
+    Parameters:
+        find (dict): Finding API response
+        sort (string): Sort order of the request
+
+    Returns:
+        [Listing]: Listings without Shopping API details
+    """
+    current_price = sort in CURRENT_PRICE_SORTS
+    answered = response_time(find)
+    listings = []
+
+    for item in as_list(find.get('searchResult', {}).get('item')):
+        info = item['listingInfo']
+        if current_price or BUY_IT_NOW not in info:
+            price = item['sellingStatus']['convertedCurrentPrice']['value']
+            auction_type = 'Auction' if 'Auction' in info['listingType'] else 'Fixed'
+        else:
+            price = info[BUY_IT_NOW]['value']
+            auction_type = 'Fixed/Auction'
+
+        ship = item['shippingInfo'].get('shippingServiceCost')
+        if ship:
+            shipping = '%.2f' % float(ship['value'])
+            if shipping == '0.00':
+                shipping = 'free'
+        else:
+            shipping = 'variable'
+
+        seller = item['sellerInfo']
+        listings.append(Listing(
+            item_id=item['itemId'], url=item['viewItemURL'],
+            title=item['title'], type=auction_type,
+            price='%.2f' % float(price), shipping=shipping,
+            condition=CONDITIONS.get(item['condition']['conditionId'], 'Used'),
+            end=end_time(item, answered),
+            location=', '.join(item['location'].split(',', 2)[:2]),
+            seller_name=seller['sellerUserName'][:20],
+            seller_percent=seller['positiveFeedbackPercent'],
+            seller_ratings=seller['feedbackScore'],
+        ))
+
+    return listings
+
+def picture(url, gallery=None):
+    """
+    Get the thumbnail size of an Ebay picture. Pictures whose URL names no
+    size use the gallery picture when given, or else themselves.
+
+    Parameters:
+        url (string): Picture URL
+        gallery (string): Gallery picture URL of the listing
+
+    Returns:
+        (string, string): Thumbnail and full size URLs
+    """
+    if PICTURE_SIZE.search(url):
+        return PICTURE_SIZE.sub(THUMBNAIL, url), url
+    if PICTURE_CODE.match(url):
+        return PICTURE_CODE.sub(CODE_THUMBNAIL, url), url
+    return gallery or url, url
+
+def parse_details(details):
+    """
+    Extract the description text and pictures of a Shopping API item
+
+    Returns:
+        (string, [(string, string)]): Text or None, and picture URLs
+    """
+    text = details.get('ConditionDescription') or details.get('Description')
+    if text and len(text) > 1000:
+        text = text[:1000] + '...'
+    # The gallery picture is the first picture
+    gallery = details.get('GalleryURL')
+    return text or None, [
+        picture(url, gallery if number == 0 else None)
+        for number, url in enumerate(as_list(details.get('PictureURL')))
+    ]
+
+def add_details(listings, shop):
+    """
+    Add description text and pictures from a Shopping API response. Details
+    are matched to listings through an item ID index built once per page.
+
+    Parameters:
+        listings ([Listing]): Listings returned by parse_listings
+        shop (dict): Shopping API response
+    """
+    index = {details['ItemID']: details for details in as_list(shop.get('Item'))}
+
+    for listing in listings:
+        details = index.get(listing.item_id)
+        if details:
+            listing.text, listing.images = parse_details(details)
+
+def normalize(find, shop, sort):
+    """
+    Build the listings shown for a Finding and Shopping API response pair
+
+    Parameters:
+        find (dict): Finding API response
+        shop (dict): Shopping API response
+        sort (string): Sort order of the request
+
+    Returns:
+        [Listing]: Listings with Shopping API details
+    """
+    listings = parse_listings(find, sort)
+    add_details(listings, shop)
+    return listings
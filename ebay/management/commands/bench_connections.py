@@ -0,0 +1,90 @@
+import time
+import asyncio
+import tempfile
+
+from django.core.management.base import BaseCommand
+
+from ebaysdk.finding import Connection as Finding
+
+from ebay import aio, pool, stub
+
+SETTINGS = {
+    'keywords': 'bench',
+    'paginationInput': {'entriesPerPage': 20, 'pageNumber': 1},
+}
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark a new Ebay connection per call against pooled keep-alive '
+        'connections on a local HTTPS stub'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=100)
+
+    def handle(self, *args, **options):
+        calls = options['calls']
+        with tempfile.TemporaryDirectory() as directory:
+            cert, key = stub.create_certificate(directory)
+            domain = stub.serve_in_thread(
+                stub.create_app(), context=stub.ssl_context(cert, key)
+            )
+
+            def connect():
+                return pool.create_connection(
+                    Finding, 'bench', domain, https=True, ca_bundle=cert
+                )
+
+            def new_connection():
+                connection = connect()
+                connection.execute('findItemsAdvanced', SETTINGS)
+                connection.session.shutdown()
+
+            pooled = connect()
+
+            def pooled_connection():
+                pooled.execute('findItemsAdvanced', SETTINGS)
+
+            async def new_session():
+                async with aio.open_session(cert) as session:
+                    await aio.execute(session, connect(), 'findItemsAdvanced', SETTINGS)
+
+            async def shared_session(session):
+                await aio.execute(session, connect(), 'findItemsAdvanced', SETTINGS)
+
+            async def run_async():
+                new = await self.atime(new_session, calls)
+                async with aio.open_session(cert) as session:
+                    await shared_session(session)
+                    shared = await self.atime(lambda: shared_session(session), calls)
+                return new, shared
+
+            pooled_connection()
+            results = [
+                ('requests', self.time(new_connection, calls),
+                 self.time(pooled_connection, calls)),
+                ('aiohttp',) + asyncio.run(run_async()),
+            ]
+            pooled.session.shutdown()
+
+        self.stdout.write('%d HTTPS calls to %s' % (calls, domain))
+        self.stdout.write('%10s %14s %14s %10s' % (
+            'transport', 'new ms/call', 'pooled ms/call', 'speedup'
+        ))
+        for name, new, pooled_time in results:
+            self.stdout.write('%10s %14.2f %14.2f %9.1fx' % (
+                name, new * 1000 / calls, pooled_time * 1000 / calls,
+                new / pooled_time
+            ))
+
+    def time(self, function, calls):
+        started = time.perf_counter()
+        for _ in range(calls):
+            function()
+        return time.perf_counter() - started
+
+    async def atime(self, function, calls):
+        started = time.perf_counter()
+        for _ in range(calls):
+            await function()
+        return time.perf_counter() - started
@@ -0,0 +1,48 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from ebaysdk.finding import Connection as Finding
+from ebaysdk.shopping import Connection as Shopping
+
+from ebay import stub
+from ebay.listings import normalize
+
+def linear_match(find, shop):
+    """
+    Match Shopping API details to listings by scanning every detail for
+    every listing, as listings were matched before the item ID index
+    """
+    for item in find['searchResult']['item']:
+        next((i for i in shop['Item'] if i['ItemID'] == item['itemId']), None)
+
+class Command(BaseCommand):
+    help = 'Benchmark listing normalization on large synthetic Ebay responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[20, 100, 500, 1000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write('%8s %14s %14s %16s' % (
+            'listings', 'normalize ms', 'per item us', 'linear match ms'
+        ))
+        for size in options['sizes']:
+            find = stub.parse(
+                Finding, 'findItemsAdvanced', stub.find_items('bench', 1, size, size)
+            )
+            ids = [item['itemId'] for item in find['searchResult']['item']]
+            shop = stub.parse(
+                Shopping, 'GetMultipleItems', stub.get_multiple_items(ids)
+            )
+
+            repeat = options['repeat']
+            normalized = min(timeit.repeat(
+                lambda: normalize(find, shop, 'price'), number=1, repeat=repeat
+            ))
+            linear = min(timeit.repeat(
+                lambda: linear_match(find, shop), number=1, repeat=repeat
+            ))
+            self.stdout.write('%8d %14.3f %14.2f %16.3f' % (
+                size, normalized * 1000, normalized * 1e6 / size, linear * 1000
+            ))
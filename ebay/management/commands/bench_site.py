@@ -0,0 +1,302 @@
+import os
+import math
+import time
+import asyncio
+import tempfile
+import itertools
+import threading
+from collections import Counter
+
+from django.conf import settings as dj_settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+from core import metrics
+from ebay import stub
+from ebay.items import ItemResponse
+from ebay.stub import Recordings
+from products.catalog import get_catalog
+
+VIEWS = ['home', 'category', 'product', 'ajax']
+METHODS = ['findItemsAdvanced', 'GetMultipleItems']
+
+# Cache backends kept in the process, which benchmarks can use as they are
+IN_PROCESS = {
+    'core.cache.TieredCache', 'core.cache.FakeSharedCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+def isolated_caches(directory):
+    """
+    Get cache settings with the configured backends storing their entries
+    apart from the site's, so benchmarks never use or change its cached
+    responses, rate limit, quotas or circuit breakers. SQLite caches are
+    kept in the directory, and networked caches are replaced with in-process
+    ones.
+
+    Parameters:
+        directory (string): Directory of the SQLite databases
+
+    Returns:
+        dict: CACHES setting
+    """
+    isolated = {}
+    for alias, config in dj_settings.CACHES.items():
+        config = dict(config)
+        if config['BACKEND'] == 'core.cache.SQLiteCache':
+            config['LOCATION'] = os.path.join(directory, '%s.sqlite3' % alias)
+        elif config['BACKEND'] not in IN_PROCESS:
+            config = {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'bench:%s' % alias,
+            }
+        isolated[alias] = config
+    return isolated
+
+def percentile(values, share):
+    """
+    Get a nearest-rank percentile
+
+    Parameters:
+        values ([float]): Sorted values
+        share (float): Percentile between 0 and 1
+
+    Returns:
+        float: Value at the percentile
+    """
+    return values[max(math.ceil(share * len(values)) - 1, 0)]
+
+class QueryCounter:
+    """
+    Count the database queries of every connection opened while installed
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self)
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the home, category, product and ajax views against a local '
+        'Ebay stub, reporting latency percentiles, throughput, queries per '
+        'request, Ebay calls per request and cache hit ratios. Caches start '
+        'empty and are kept apart from the site\'s.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--views', nargs='+', choices=VIEWS, default=VIEWS)
+        parser.add_argument(
+            '--requests', type=int, default=200, help='Requests per view'
+        )
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--products', type=int, default=10,
+            help='Number of products requested by the product and ajax views'
+        )
+        parser.add_argument(
+            '--ajax-pages', type=int, default=4,
+            help='Number of "Load More" pages requested per product'
+        )
+        parser.add_argument('--total', type=int, default=200)
+        parser.add_argument('--latency', type=float, default=0.05)
+        parser.add_argument('--jitter', type=float, default=0)
+        parser.add_argument('--error-rate', type=float, default=0)
+        parser.add_argument('--failure-rate', type=float, default=0)
+        parser.add_argument('--recordings')
+        parser.add_argument(
+            '--max-p95', type=float,
+            help='Fail when a view\'s 95th percentile exceeds this many ms'
+        )
+        parser.add_argument(
+            '--max-queries', type=float,
+            help='Fail when a view averages more queries per request'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        recordings = None
+        if options['recordings']:
+            recordings = Recordings(options['recordings'])
+        app = stub.create_app(
+            options['total'], options['latency'], options['jitter'],
+            options['error_rate'], options['failure_rate'], recordings
+        )
+        domain = stub.serve_in_thread(app)
+        self.upstream = app['calls']
+
+        # The stub accepts any app ID and is not rate limited, and requests
+        # come from the test client
+        app_id = ItemResponse.app_id
+        ItemResponse.app_id = app_id or 'bench'
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            CACHES=isolated_caches(directory),
+            EBAY_FINDING_DOMAIN=domain, EBAY_SHOPPING_DOMAIN=domain,
+            EBAY_HTTPS=False, EBAY_RATE_LIMIT=10 ** 6, EBAY_RATE_BURST=10 ** 6,
+            EBAY_DAILY_QUOTA={}, ALLOWED_HOSTS=['testserver'],
+        ):
+            self.queries = QueryCounter()
+            connections.close_all()
+            connection_created.connect(self.queries.install)
+            try:
+                results = [
+                    self.run_view(view, self.get_urls(view))
+                    for view in options['views']
+                ]
+            finally:
+                connection_created.disconnect(self.queries.install)
+                ItemResponse.app_id = app_id
+
+        self.report(results)
+
+    def get_urls(self, view):
+        """
+        Get the URLs requested for a view
+
+        Returns:
+            [string]: URL paths
+        """
+        catalog = get_catalog()
+        products = sorted(
+            catalog.products.nodes, key=lambda product: -product.order
+        )[:self.options['products']]
+        if view == 'home':
+            return [reverse('home')]
+        if view == 'category':
+            return [
+                reverse('category', args=[category.slug])
+                for category in catalog.categories.nodes
+            ]
+        if view == 'product':
+            return [
+                reverse('product', args=[product.category.slug, product.slug])
+                for product in products
+            ]
+        return [
+            '%s?page=%d' % (
+                reverse('ajax', args=[product.category.slug, product.slug]), page
+            )
+            for product in products
+            for page in range(2, self.options['ajax_pages'] + 2)
+        ]
+
+    def run_view(self, view, urls):
+        """
+        Request a view's URLs in turn at the configured concurrency
+
+        Returns:
+            dict: Measurements of the view
+        """
+        if not urls:
+            raise CommandError('No URLs to request for the %s view' % view)
+
+        urls = itertools.islice(itertools.cycle(urls), self.options['requests'])
+        latencies = []
+        statuses = Counter()
+
+        async def worker(client):
+            for url in urls:
+                started = time.perf_counter()
+                try:
+                    status = (await client.get(url)).status_code
+                except Exception:
+                    status = 'exception'
+                latencies.append(time.perf_counter() - started)
+                statuses[status] += 1
+
+        async def run():
+            await asyncio.gather(*[
+                worker(AsyncClient(REMOTE_ADDR='127.0.0.1'))
+                for _ in range(self.options['concurrency'])
+            ])
+
+        queries = self.queries.count
+        upstream = self.upstream_calls()
+        lookups = metrics.get_counter('ebay_cache_lookups')
+        started = time.perf_counter()
+        asyncio.run(run())
+        elapsed = time.perf_counter() - started
+
+        count = len(latencies)
+        lookups = metrics.get_counter('ebay_cache_lookups') - lookups
+        return {
+            'view': view, 'requests': count,
+            'errors': count - statuses[200] - statuses[304],
+            'latencies': sorted(latencies), 'throughput': count / elapsed,
+            'queries': (self.queries.count - queries) / count,
+            'upstream': (self.upstream_calls() - upstream) / count,
+            'lookups': lookups,
+        }
+
+    def upstream_calls(self):
+        """
+        Returns:
+            int: Calls answered by the stub so far
+        """
+        return sum(self.upstream[method] for method in METHODS)
+
+    def report(self, results):
+        """
+        Write the measurements of every view, failing when a threshold is
+        exceeded
+        """
+        self.stdout.write('%8s %8s %6s %8s %8s %8s %8s %8s %8s %8s %8s %8s' % (
+            'view', 'requests', 'errors', 'p50 ms', 'p90 ms', 'p95 ms', 'p99 ms',
+            'max ms', 'req/s', 'queries', 'ebay', 'hit',
+        ))
+        failures = []
+        for result in results:
+            latencies = [latency * 1000 for latency in result['latencies']]
+            p95 = percentile(latencies, 0.95)
+            self.stdout.write(
+                '%8s %8d %6d %8.1f %8.1f %8.1f %8.1f %8.1f %8.1f %8.2f %8.2f %8s' % (
+                    result['view'], result['requests'], result['errors'],
+                    percentile(latencies, 0.5), percentile(latencies, 0.9), p95,
+                    percentile(latencies, 0.99), latencies[-1],
+                    result['throughput'], result['queries'], result['upstream'],
+                    self.hit_ratio(result['lookups']),
+                )
+            )
+            if self.options['max_p95'] is not None and p95 > self.options['max_p95']:
+                failures.append('%s p95 %.1f ms' % (result['view'], p95))
+            if (
+                self.options['max_queries'] is not None and
+                result['queries'] > self.options['max_queries']
+            ):
+                failures.append('%s %.2f queries per request' % (
+                    result['view'], result['queries']
+                ))
+
+        self.stdout.write(
+            'ebay: Ebay calls per request, hit: listings served from the cache, '
+            'then Ebay responses served from the cache'
+        )
+        if failures:
+            raise CommandError('Thresholds exceeded: %s' % ', '.join(failures))
+
+    def hit_ratio(self, lookups):
+        """
+        Returns:
+            string: Listings and Ebay response hit ratios, '-' without lookups
+        """
+        ratios = []
+        for hits, misses in [
+            (lookups['items:hit'], lookups['items:miss']),
+            (lookups['response:fresh'] + lookups['response:stale'],
+             lookups['response:miss']),
+        ]:
+            ratios.append(
+                '%.0f%%' % (100 * hits / (hits + misses)) if hits + misses else '-'
+            )
+        return '/'.join(ratios)
@@ -0,0 +1,73 @@
+from aiohttp import web
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ebay.stub import Recordings, create_app, ssl_context
+
+class Command(BaseCommand):
+    help = 'Run a local stub server for the Ebay Finding and Shopping APIs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument(
+            '--total', type=int, default=200,
+            help='Total number of listings reported for every search'
+        )
+        parser.add_argument('--cert', help='Certificate file to serve HTTPS with')
+        parser.add_argument('--key', help='Private key of the certificate')
+        parser.add_argument(
+            '--latency', type=float, default=0,
+            help='Seconds every response is delayed'
+        )
+        parser.add_argument(
+            '--jitter', type=float, default=0,
+            help='Extra random delay of up to this many seconds'
+        )
+        parser.add_argument(
+            '--error-rate', type=float, default=0,
+            help='Share of requests answered with HTTP 503'
+        )
+        parser.add_argument(
+            '--failure-rate', type=float, default=0,
+            help='Share of requests answered with a Failure ack'
+        )
+        parser.add_argument(
+            '--recordings',
+            help='Directory of recorded responses served in place of synthetic ones'
+        )
+        parser.add_argument(
+            '--record', action='store_true',
+            help='Fetch responses missing from --recordings from Ebay and record them'
+        )
+
+    def handle(self, *args, **options):
+        if options['record'] and not options['recordings']:
+            raise CommandError('--record requires --recordings')
+        recordings = None
+        if options['recordings']:
+            recordings = Recordings(options['recordings'], options['record'])
+
+        context = None
+        if options['cert']:
+            context = ssl_context(options['cert'], options['key'])
+            self.stdout.write(
+                'Set EBAY_FINDING_DOMAIN and EBAY_SHOPPING_DOMAIN to %s:%d and '
+                'EBAY_CA_BUNDLE to the certificate to use the stub' % (
+                    options['host'], options['port']
+                )
+            )
+        else:
+            self.stdout.write(
+                'Set EBAY_FINDING_DOMAIN and EBAY_SHOPPING_DOMAIN to %s:%d and '
+                'EBAY_HTTPS to false to use the stub' % (
+                    options['host'], options['port']
+                )
+            )
+        web.run_app(
+            create_app(
+                options['total'], options['latency'], options['jitter'],
+                options['error_rate'], options['failure_rate'], recordings
+            ), host=options['host'],
+            port=options['port'], ssl_context=context, print=None
+        )
@@ -0,0 +1,31 @@
+from django.conf import settings as dj_settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache import SQLiteCache
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired entries from SQLite caches, evict entries until they '
+        'fit in their MAX_SIZE and release the freed disk space'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases', nargs='*',
+            help='Cache aliases to sweep, every SQLite cache by default'
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or [
+            alias for alias in dj_settings.CACHES
+            if isinstance(caches[alias], SQLiteCache)
+        ]
+        for alias in aliases:
+            cache = caches[alias]
+            if not isinstance(cache, SQLiteCache):
+                raise CommandError('%s is not a SQLite cache' % alias)
+            deleted, size = cache.sweep()
+            self.stdout.write('%s: deleted %d entries, %.1f MB stored' % (
+                alias, deleted, size / 1024 / 1024
+            ))
@@ -0,0 +1,113 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings as dj_settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from ebay.errors import UpstreamError
+from ebay.models import ListingSync
+from ebay.store import SyncFailed, sync_product
+from products.catalog import get_catalog
+
+class Command(BaseCommand):
+    help = (
+        'Sync the local listing store with the Ebay listings of featured and '
+        'top products, so their sort orders and condition or price filters '
+        'are answered without calling Ebay'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=20,
+            help='Number of products with the highest order to sync besides featured ones'
+        )
+        parser.add_argument(
+            '--products', nargs='*', default=[],
+            help='Slugs of the products to sync instead'
+        )
+        parser.add_argument(
+            '--size', type=int, default=dj_settings.EBAY_STORE_SIZE,
+            help='Most listings stored per product'
+        )
+        parser.add_argument(
+            '--max-age', type=int, default=dj_settings.EBAY_STORE_TTL // 2,
+            help='Seconds since their last sync under which products are skipped'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep syncing every --interval seconds'
+        )
+        parser.add_argument('--interval', type=int, default=300)
+
+    def handle(self, *args, **options):
+        if options['max_age'] >= dj_settings.EBAY_STORE_TTL:
+            raise CommandError('--max-age must be lower than EBAY_STORE_TTL')
+        self.options = options
+
+        number = 1
+        while True:
+            self.run_pass(number)
+            if not options['loop']:
+                break
+            number += 1
+            time.sleep(options['interval'])
+
+    def get_products(self):
+        """
+        Get the products to sync: the given ones, or featured products then
+        the top products by order
+
+        Returns:
+            [Product]: Products without duplicates
+        """
+        catalog = get_catalog()
+        if self.options['products']:
+            products = []
+            for slug in self.options['products']:
+                product = catalog.products.get(slug)
+                if product is None:
+                    raise CommandError('Unknown product: %s' % slug)
+                products.append(product)
+            return products
+
+        products = [product for product in catalog.products.nodes if product.featured]
+        products.extend(sorted(
+            catalog.products.nodes, key=lambda product: -product.order
+        )[:self.options['top']])
+        return list({product.id: product for product in products}.values())
+
+    def run_pass(self, number):
+        """
+        Sync every product not synced within --max-age and report the
+        changes made to the store
+        """
+        close_old_connections()
+        started = time.time()
+        recent = set(ListingSync.objects.filter(
+            synced__gt=timezone.now() - timedelta(seconds=self.options['max_age'])
+        ).values_list('product_id', flat=True))
+
+        stats = {'synced': 0, 'complete': 0, 'skipped': 0, 'failed': 0}
+        changes = [0, 0, 0]
+        for product in self.get_products():
+            if product.id in recent:
+                stats['skipped'] += 1
+                continue
+            try:
+                *counts, complete = sync_product(product, self.options['size'])
+            except (SyncFailed, UpstreamError) as error:
+                self.stderr.write(str(error))
+                stats['failed'] += 1
+                continue
+            stats['synced'] += 1
+            stats['complete'] += complete
+            changes = [total + count for total, count in zip(changes, counts)]
+
+        self.stdout.write(
+            'pass %d: %s, listings created %d, updated %d, deleted %d, %.1fs' % (
+                number, ', '.join('%s %d' % item for item in stats.items()),
+                *changes, time.time() - started
+            )
+        )
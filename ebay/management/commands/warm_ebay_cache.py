@@ -0,0 +1,260 @@
+import time
+from collections import Counter, deque
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings as dj_settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.http import HttpRequest, QueryDict
+
+from ebaysdk.finding import Connection as Finding
+from ebaysdk.shopping import Connection as Shopping
+
+from ebay.cache import make_key, warm
+from ebay.geo import bucket_postal_code
+from ebay.items import ItemResponse
+from ebay.errors import Unavailable, UpstreamError
+from products.catalog import get_catalog
+
+OUTCOMES = ['hit', 'miss', 'refresh', 'busy', 'skipped', 'error']
+
+class BudgetExhausted(Exception):
+    pass
+
+class Budget:
+    """
+    Ebay calls made by the warmer over a sliding one hour window
+
+    Attributes:
+        calls_per_hour (int): Calls allowed within any hour
+    """
+
+    def __init__(self, calls_per_hour):
+        self.calls_per_hour = calls_per_hour
+        self.calls = deque()
+        self.lock = Lock()
+
+    def expire(self, now):
+        while self.calls and now - self.calls[0] >= 3600:
+            self.calls.popleft()
+
+    def spend(self):
+        """
+        Record a call, raising BudgetExhausted when none are left this hour
+        """
+        with self.lock:
+            now = time.time()
+            self.expire(now)
+            if len(self.calls) >= self.calls_per_hour:
+                raise BudgetExhausted()
+            self.calls.append(now)
+
+    def remaining(self):
+        """
+        Returns:
+            int: Calls left within the current hour
+        """
+        with self.lock:
+            self.expire(time.time())
+            return self.calls_per_hour - len(self.calls)
+
+class Command(BaseCommand):
+    help = (
+        'Refresh cached Ebay results of featured and top products before they '
+        'go stale. Only useful when the ebay cache alias is shared with the '
+        'web workers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=20,
+            help='Number of products with the highest order to warm besides featured ones'
+        )
+        parser.add_argument('--sorts', nargs='+', default=['best', 'price'])
+        parser.add_argument('--pages', type=int, default=1)
+        parser.add_argument(
+            '--postal-codes', nargs='*', default=[],
+            help='Buyer postal codes to warm in addition to requests without one'
+        )
+        parser.add_argument(
+            '--budget', type=int, default=dj_settings.EBAY_WARM_BUDGET,
+            help='Ebay calls allowed per hour'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=dj_settings.EBAY_WARM_CONCURRENCY
+        )
+        parser.add_argument(
+            '--margin', type=int, default=dj_settings.EBAY_WARM_MARGIN,
+            help='Seconds before going stale that an entry is refreshed'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep warming every --interval seconds'
+        )
+        parser.add_argument('--interval', type=int, default=300)
+
+    def handle(self, *args, **options):
+        for sort in options['sorts']:
+            if sort not in ItemResponse.sort_by:
+                raise CommandError('Unknown sort order: %s' % sort)
+            ttl = dj_settings.EBAY_CACHE_TTLS.get(sort, dj_settings.EBAY_CACHE_TTL)
+            if options['margin'] >= ttl:
+                raise CommandError(
+                    '--margin must be lower than the %s sort order\'s cache '
+                    'TTL of %d seconds' % (sort, ttl)
+                )
+        if options['loop'] and options['interval'] >= options['margin']:
+            self.stderr.write(
+                'Warning: --interval is not lower than --margin, entries may '
+                'go stale between passes'
+            )
+
+        self.options = options
+        self.budget = Budget(options['budget'])
+        self.stats_lock = Lock()
+
+        number = 1
+        while True:
+            self.run_pass(number)
+            if not options['loop']:
+                break
+            number += 1
+            time.sleep(options['interval'])
+
+    def get_products(self):
+        """
+        Get the products to warm: featured products, the top products by
+        order, then the products of featured categories
+
+        Returns:
+            [Product]: Products in priority order without duplicates
+        """
+        catalog = get_catalog()
+        products = [product for product in catalog.products.nodes if product.featured]
+        products.extend(sorted(
+            catalog.products.nodes, key=lambda product: -product.order
+        )[:self.options['top']])
+        for category in catalog.categories.nodes:
+            if category.featured:
+                for each in catalog.categories.descendants(category, include_self=True):
+                    products.extend(catalog.products_in(each))
+
+        seen = set()
+        unique = []
+        for product in products:
+            if product.id not in seen:
+                seen.add(product.id)
+                unique.append(product)
+        return unique
+
+    def get_pages(self):
+        """
+        Build the item response and Finding API settings of every window to
+        warm, the way a product page request would, with the pages to warm
+        in each window. Sort orders of products whose cache TTL, category
+        overrides included, is not above --margin are skipped, as their
+        entries would be refreshed on every pass.
+
+        Returns:
+            [(ItemResponse, dict, [int])]: Item responses, their find settings
+                and page numbers
+        """
+        postal_codes = [None] + [
+            bucket_postal_code(code) for code in self.options['postal_codes']
+        ]
+        windows = {}
+        for product in self.get_products():
+            for sort in self.options['sorts']:
+                for page in range(1, self.options['pages'] + 1):
+                    request = HttpRequest()
+                    request.GET = QueryDict(mutable=True)
+                    request.GET.update({'sort': sort, 'page': page})
+                    item_response = ItemResponse(request, product)
+                    if item_response.ttl <= self.options['margin']:
+                        if page == 1:
+                            self.stderr.write(
+                                'Skipping %s sorted by %s: its cache TTL of %d '
+                                'seconds is not above --margin' % (
+                                    product, sort, item_response.ttl
+                                )
+                            )
+                        break
+                    find_settings = item_response.find_settings()
+                    for zipcode in dict.fromkeys(postal_codes):
+                        page_settings = dict(find_settings)
+                        page_settings.pop('buyerPostalCode', None)
+                        if zipcode:
+                            page_settings['buyerPostalCode'] = zipcode
+                        key = make_key('findItemsAdvanced', page_settings)
+                        windows.setdefault(key, (item_response, page_settings, []))
+                        windows[key][2].append(page)
+        return list(windows.values())
+
+    def run_pass(self, number):
+        """
+        Warm every page once and report the outcome of each Ebay cache entry
+        """
+        close_old_connections()
+        started = time.time()
+        self.stats = Counter()
+        pages = self.get_pages()
+
+        with ThreadPoolExecutor(max_workers=self.options['concurrency']) as pool:
+            list(pool.map(lambda page: self.warm_page(*page), pages))
+
+        self.stdout.write(
+            'pass %d: %d windows, %s, %d calls left this hour, %.1fs' % (
+                number, len(pages),
+                ', '.join('%s %d' % (name, self.stats[name]) for name in OUTCOMES),
+                self.budget.remaining(), time.time() - started
+            )
+        )
+
+    def warm_page(self, item_response, find_settings, pages):
+        """
+        Warm the Finding API results of a window, then the Shopping API
+        details of the listings of each page
+        """
+        find = self.warm_call(
+            item_response, Finding, 'findItemsAdvanced', find_settings,
+            item_response.tag_version
+        )
+        if not find or find['ack'] != 'Success':
+            return
+        for page in pages:
+            shop_settings = item_response.shop_settings(
+                item_response.page_find(find, find_settings, page)
+            )
+            if shop_settings:
+                self.warm_call(
+                    item_response, Shopping, 'GetMultipleItems', shop_settings
+                )
+
+    def warm_call(self, item_response, api, method, settings, version=None):
+        """
+        Warm the cache entry of an Ebay call, spending the budget only when
+        Ebay is called. The version is that of the tags of the catalog data
+        the settings were built from.
+
+        Returns:
+            dict: Cached or fetched response, or None
+        """
+        def fetcher():
+            self.budget.spend()
+            return item_response.request_ebay(api, method, settings)
+
+        try:
+            outcome, response = warm(
+                make_key(method, settings, version), fetcher,
+                self.options['margin'], item_response.ttl
+            )
+        except UpstreamError as error:
+            self.stderr.write(str(error))
+            outcome, response = 'error', None
+        except (BudgetExhausted, Unavailable):
+            outcome, response = 'skipped', None
+
+        with self.stats_lock:
+            self.stats[outcome] += 1
+        return response
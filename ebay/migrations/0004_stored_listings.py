@@ -0,0 +1,58 @@
+# Generated by Django 4.2.16 on 2026-10-17 10:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ebay', '0003_delete_authorization'),
+        ('products', '__first__'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingSync',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing_sync', serialize=False, to='products.product')),
+                ('search', models.CharField(max_length=100)),
+                ('synced', models.DateTimeField()),
+                ('total', models.PositiveIntegerField()),
+                ('complete', models.BooleanField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StoredListing',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_id', models.CharField(max_length=20)),
+                ('rank', models.PositiveIntegerField()),
+                ('listing_type', models.CharField(max_length=20)),
+                ('condition', models.CharField(max_length=10)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('buy_it_now', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('shipping', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('sort_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('ends', models.DateTimeField()),
+                ('started', models.DateTimeField(blank=True, null=True)),
+                ('seller_name', models.CharField(max_length=20)),
+                ('seller_percent', models.CharField(max_length=10)),
+                ('seller_score', models.IntegerField()),
+                ('title', models.CharField(max_length=100)),
+                ('url', models.URLField(max_length=500)),
+                ('location', models.CharField(max_length=100)),
+                ('text', models.TextField(blank=True, null=True)),
+                ('images', models.JSONField(blank=True, default=list)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stored_listings', to='products.product')),
+            ],
+            options={
+                'ordering': ['product', 'rank'],
+                'indexes': [models.Index(fields=['product', 'rank'], name='ebay_stored_product_e01294_idx'), models.Index(fields=['product', 'sort_price'], name='ebay_stored_product_a9c29c_idx'), models.Index(fields=['product', 'ends'], name='ebay_stored_product_c507ec_idx'), models.Index(fields=['product', 'started'], name='ebay_stored_product_285680_idx'), models.Index(fields=['product', 'condition', 'price'], name='ebay_stored_product_052836_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='storedlisting',
+            constraint=models.UniqueConstraint(fields=('product', 'item_id'), name='stored_listing_item'),
+        ),
+    ]
@@ -0,0 +1,97 @@
+from django.db import models
+
+from products.models import Product
+
+from .listings import Listing
+
+class StoredListing(models.Model):
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='stored_listings'
+    )
+    item_id = models.CharField(max_length=20)
+    rank = models.PositiveIntegerField()
+    listing_type = models.CharField(max_length=20)
+    condition = models.CharField(max_length=10)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    buy_it_now = models.DecimalField(
+        max_digits=10, decimal_places=2, blank=True, null=True
+    )
+    shipping = models.DecimalField(
+        max_digits=10, decimal_places=2, blank=True, null=True
+    )
+    sort_price = models.DecimalField(max_digits=10, decimal_places=2)
+    ends = models.DateTimeField()
+    started = models.DateTimeField(blank=True, null=True)
+    seller_name = models.CharField(max_length=20)
+    seller_percent = models.CharField(max_length=10)
+    seller_score = models.IntegerField()
+    title = models.CharField(max_length=100)
+    url = models.URLField(max_length=500)
+    location = models.CharField(max_length=100)
+    text = models.TextField(blank=True, null=True)
+    images = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'item_id'], name='stored_listing_item'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'rank']),
+            models.Index(fields=['product', 'sort_price']),
+            models.Index(fields=['product', 'ends']),
+            models.Index(fields=['product', 'started']),
+            models.Index(fields=['product', 'condition', 'price']),
+        ]
+
+    def __str__(self):
+        return '%s: %s' % (self.item_id, self.title)
+
+    def to_listing(self, current_price):
+        """
+        Build the record shown in the results template, priced the way
+        parse_listings prices listings for the request's sort order
+
+        Parameters:
+            current_price (bool): Whether the current price is shown rather
+                than the Buy It Now price
+
+        Returns:
+            Listing: Listing record
+        """
+        if current_price or self.buy_it_now is None:
+            price = self.price
+            auction_type = 'Auction' if 'Auction' in self.listing_type else 'Fixed'
+        else:
+            price = self.buy_it_now
+            auction_type = 'Fixed/Auction'
+
+        if self.shipping is None:
+            shipping = 'variable'
+        else:
+            shipping = 'free' if not self.shipping else '%.2f' % self.shipping
+
+        return Listing(
+            item_id=self.item_id, url=self.url, title=self.title,
+            type=auction_type, price='%.2f' % price, shipping=shipping,
+            condition=self.condition, end=int(self.ends.timestamp()),
+            location=self.location, seller_name=self.seller_name,
+            seller_percent=self.seller_percent,
+            seller_ratings=str(self.seller_score), text=self.text,
+            images=[tuple(image) for image in self.images],
+        )
+
+class ListingSync(models.Model):
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True,
+        related_name='listing_sync'
+    )
+    search = models.CharField(max_length=100)
+    synced = models.DateTimeField()
+    total = models.PositiveIntegerField()
+    complete = models.BooleanField()
+
+    def __str__(self):
+        return str(self.product)
@@ -0,0 +1,84 @@
+import threading
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from django.conf import settings as dj_settings
+
+# Connections reused by the current thread, keyed on API, app ID and domain
+local = threading.local()
+
+class KeepAliveSession(Session):
+    """
+    Requests session whose connections stay open across Ebay calls. Ebaysdk
+    closes its session after every response, which would drop the pooled
+    connections, so close() does nothing and shutdown() closes it. Ebaysdk
+    also always verifies certificates against the default bundle, so the
+    session's own verify setting is used instead.
+    """
+
+    def close(self):
+        pass
+
+    def shutdown(self):
+        super(KeepAliveSession, self).close()
+
+    def send(self, request, **kwargs):
+        kwargs['verify'] = self.verify
+        return super(KeepAliveSession, self).send(request, **kwargs)
+
+def create_connection(api, app_id, domain, https=None, ca_bundle=None):
+    """
+    Create an Ebaysdk connection using a keep-alive session. Failed calls
+    are not retried, the circuit breaker handles outages.
+
+    Parameters:
+        api: Ebaysdk connection method
+        app_id (string): Ebay application ID
+        domain (string): API domain
+        https (bool): Whether to use HTTPS, EBAY_HTTPS by default
+        ca_bundle (string): CA bundle path, EBAY_CA_BUNDLE by default
+
+    Returns:
+        Ebaysdk connection object
+    """
+    connection = api(
+        appid=app_id, domain=domain, config_file=None, timeout=(
+            dj_settings.EBAY_CONNECT_TIMEOUT, dj_settings.EBAY_READ_TIMEOUT
+        )
+    )
+    if https is None:
+        https = dj_settings.EBAY_HTTPS
+    connection.config.set('https', https, force=True)
+
+    session = KeepAliveSession()
+    session.verify = ca_bundle or dj_settings.EBAY_CA_BUNDLE or True
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    connection.session = session
+    return connection
+
+def get_connection(api, app_id, domain):
+    """
+    Get the current thread's connection to an API, creating it on first use.
+    Connections hold the state of the call being made, so each thread keeps
+    its own and reuses its open HTTP connection for every call.
+
+    Parameters:
+        api: Ebaysdk connection method
+        app_id (string): Ebay application ID
+        domain (string): API domain
+
+    Returns:
+        Ebaysdk connection object
+    """
+    connections = getattr(local, 'connections', None)
+    if connections is None:
+        connections = local.connections = {}
+
+    key = (api, app_id, domain, dj_settings.EBAY_HTTPS)
+    connection = connections.get(key)
+    if connection is None:
+        connection = connections[key] = create_connection(api, app_id, domain)
+    return connection
@@ -0,0 +1,166 @@
+import time
+import uuid
+
+from django.conf import settings as dj_settings
+from django.core.cache import caches
+
+from core.cache import is_shared
+
+from .errors import RateLimited
+
+# Counters kept per API method and day
+COUNTERS = ['calls', 'limited', 'degraded']
+
+def today():
+    """
+    Returns:
+        string: Current UTC date quotas are counted against
+    """
+    return time.strftime('%Y-%m-%d', time.gmtime())
+
+def get_cache():
+    """
+    Get the cache holding quota counters, the rate limit bucket and circuit
+    breakers. They live in the shared tier of the Ebay cache, so every
+    machine counts against the same quotas. While the shared tier is down
+    each process counts on its own against its share of the limits.
+
+    Returns:
+        BaseCache: Django cache backend for the 'ebay' alias
+    """
+    return caches['ebay']
+
+def share():
+    """
+    Get the part of the rate limit and quotas left to this process. It is
+    all of them while their state is shared, otherwise every worker process
+    of the machine, EBAY_PROCESSES of them, counts on its own.
+
+    Returns:
+        int: Number of processes splitting the limits
+    """
+    return 1 if is_shared('ebay') else max(dj_settings.EBAY_PROCESSES, 1)
+
+def incr(key, delta=1, timeout=None):
+    """
+    Atomically increase a counter in the shared cache, creating it when it
+    is missing or was evicted
+
+    Returns:
+        int: New counter value
+    """
+    cache = get_cache()
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, timeout)
+        return cache.incr(key, delta)
+
+def counter_key(method, name, day=None):
+    """
+    Returns:
+        string: Cache key of a method's counter for a day, today by default
+    """
+    return 'quota:%s:%s:%s' % (day or today(), method, name)
+
+def count(method, name, delta=1):
+    """
+    Change today's counter of an API method
+
+    Parameters:
+        method (string): Ebay API search type
+        name (string): Counter name from COUNTERS
+        delta (int): Amount added to the counter
+
+    Returns:
+        int: New counter value
+    """
+    return incr(counter_key(method, name), delta, timeout=2 * 86400)
+
+def take_token(wait=1):
+    """
+    Take a token from the bucket shared by every process using the shared
+    cache, or this process's share of it while the cache isn't shared. The
+    bucket is kept as its number of tokens and the time it was
+    last refilled, and refilled by the time elapsed since, up to
+    EBAY_RATE_BURST tokens. It is changed under a lock, and tokens are
+    refused when the lock can't be taken within wait seconds.
+
+    Parameters:
+        wait (float): Seconds to wait for the bucket's lock
+
+    Returns:
+        bool: Whether a token was available
+    """
+    processes = share()
+    rate = dj_settings.EBAY_RATE_LIMIT / processes
+    burst = max(dj_settings.EBAY_RATE_BURST / processes, 1)
+    cache = get_cache()
+
+    token = uuid.uuid4().hex
+    deadline = time.time() + wait
+    while not cache.add('ratelimit:lock', token, 1):
+        if time.time() >= deadline:
+            return False
+        time.sleep(0.005)
+
+    try:
+        now = time.time()
+        tokens, refilled = cache.get('ratelimit:bucket', (burst, now))
+        tokens = min(burst, tokens + max(now - refilled, 0) * rate)
+        taken = tokens >= 1
+        # A bucket left alone this long is full again
+        cache.set(
+            'ratelimit:bucket', (tokens - taken, now), max(burst / rate, 1)
+        )
+        return taken
+    finally:
+        if cache.get('ratelimit:lock') == token:
+            cache.delete('ratelimit:lock')
+
+def take(method):
+    """
+    Account for an Ebay call, refusing it once the method's daily quota or
+    the shared rate limit is exhausted
+
+    Parameters:
+        method (string): Ebay API search type
+
+    Raises:
+        RateLimited: The call must not be made
+    """
+    quota = dj_settings.EBAY_DAILY_QUOTA.get(method)
+    if quota is not None:
+        quota //= share()
+    calls = count(method, 'calls')
+    if quota is not None and calls > quota:
+        message = 'Daily %s quota exhausted' % method
+    elif not take_token():
+        message = 'Ebay rate limit reached'
+    else:
+        return
+
+    count(method, 'calls', -1)
+    count(method, 'limited')
+    raise RateLimited(method, message)
+
+def get_counters(day=None):
+    """
+    Get the counters of every API method with a configured quota
+
+    Parameters:
+        day (string): UTC date, today by default
+
+    Returns:
+        dict: Counters and quota per API method
+    """
+    day = day or today()
+    counters = {}
+    for method, quota in dj_settings.EBAY_DAILY_QUOTA.items():
+        keys = [counter_key(method, name, day) for name in COUNTERS]
+        values = get_cache().get_many(keys)
+        counters[method] = {
+            name: values.get(key, 0) for name, key in zip(COUNTERS, keys)
+        }
+        counters[method]['quota'] = quota
+    return {'day': day, 'methods': counters}
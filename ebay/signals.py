@@ -0,0 +1,60 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+
+from products.models import Category, Product
+from refinements.models import Aspect, Filter
+
+from .cache import purge_tags
+
+# Catalog models whose instances tag the cache entries built from them
+TAGGED = {Category: 'category', Product: 'product', Filter: 'filter'}
+
+def get_tags(instance):
+    """
+    Get the cache tags affected by an edit of a catalog object. Aspects
+    refine the searches of the products and filters they belong to.
+
+    Returns:
+        [string]: Tags such as 'product:<id>'
+    """
+    if isinstance(instance, Aspect):
+        return [
+            'product:%d' % pk for pk in instance.product_set.values_list('pk', flat=True)
+        ] + [
+            'filter:%d' % pk for pk in instance.filter_set.values_list('pk', flat=True)
+        ]
+    return ['%s:%d' % (TAGGED[type(instance)], instance.pk)]
+
+def purge_entries(instance, **kwargs):
+    """
+    Purge the cached Ebay results built from an edited catalog object, so
+    they are fetched again with the new search right away. Tags get new
+    versions once the edit is committed, so entries cached under them are
+    built from the new catalog data.
+    """
+    transaction.on_commit(partial(purge_tags, get_tags(instance)))
+
+def purge_links(instance, action, model, pk_set, **kwargs):
+    """
+    Purge the cached Ebay results of both sides of changed aspect or filter
+    links
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    tags = get_tags(instance)
+    if model in TAGGED:
+        tags.extend('%s:%d' % (TAGGED[model], pk) for pk in pk_set or ())
+    transaction.on_commit(partial(purge_tags, tags))
+
+for model in [Category, Product, Filter]:
+    post_save.connect(purge_entries, sender=model)
+    post_delete.connect(purge_entries, sender=model)
+
+# The products and filters of an aspect are gone once it is deleted
+post_save.connect(purge_entries, sender=Aspect)
+pre_delete.connect(purge_entries, sender=Aspect)
+
+for through in [Product.aspects.through, Product.filters.through, Filter.aspects.through]:
+    m2m_changed.connect(purge_links, sender=through)
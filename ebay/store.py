@@ -0,0 +1,192 @@
+from decimal import Decimal
+from datetime import datetime, timezone
+
+from django.db import transaction
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone as dj_timezone
+
+from ebaysdk.finding import Connection as Finding
+from ebaysdk.shopping import Connection as Shopping
+
+from core.versions import bump_version
+
+from .cache import response_time
+from .items import ItemResponse
+from .listings import (
+    BUY_IT_NOW, CONDITIONS, END_TIME, as_list, end_time, parse_details
+)
+from .models import ListingSync, StoredListing
+
+# Item IDs per Shopping API call
+DETAILS_BATCH = 20
+
+# Fields a sync may change on a stored listing
+UPDATED_FIELDS = [
+    'rank', 'listing_type', 'condition', 'price', 'buy_it_now', 'shipping',
+    'sort_price', 'ends', 'started', 'seller_name', 'seller_percent',
+    'seller_score', 'title', 'url', 'location', 'text', 'images',
+]
+
+class SyncFailed(Exception):
+    pass
+
+def listing_fields(item, answered, rank):
+    """
+    Extract the stored fields of a Finding API item
+
+    Parameters:
+        item (dict): Finding API item
+        answered (float): Time from response_time
+        rank (int): Position of the item in best match order
+
+    Returns:
+        dict: StoredListing field values
+    """
+    info = item['listingInfo']
+    price = Decimal(item['sellingStatus']['convertedCurrentPrice']['value'])
+    buy_it_now = Decimal(info[BUY_IT_NOW]['value']) if BUY_IT_NOW in info else None
+    ship = item['shippingInfo'].get('shippingServiceCost')
+    shipping = Decimal(ship['value']) if ship else None
+
+    try:
+        started = datetime.strptime(info['startTime'], END_TIME).replace(
+            tzinfo=timezone.utc
+        )
+    except (KeyError, ValueError):
+        started = None
+
+    seller = item['sellerInfo']
+    return {
+        'rank': rank, 'listing_type': info['listingType'],
+        'condition': CONDITIONS.get(item['condition']['conditionId'], 'Used'),
+        'price': price, 'buy_it_now': buy_it_now, 'shipping': shipping,
+        'sort_price': (price if buy_it_now is None else buy_it_now) + (shipping or 0),
+        'ends': datetime.fromtimestamp(end_time(item, answered), timezone.utc),
+        'started': started,
+        'seller_name': seller['sellerUserName'][:20],
+        'seller_percent': seller['positiveFeedbackPercent'],
+        'seller_score': int(seller['feedbackScore']),
+        'title': item['title'][:100], 'url': item['viewItemURL'],
+        'location': ', '.join(item['location'].split(',', 2)[:2]),
+    }
+
+def find_listings(item_response, size):
+    """
+    Fetch the listings of a product's search in best match order, one
+    Finding API window at a time
+
+    Parameters:
+        item_response (ItemResponse): Item response of the search
+        size (int): Most listings fetched
+
+    Returns:
+        (string, int, dict): Search key, total number of listings, and rank,
+            Finding API item and response time per item ID
+
+    Raises:
+        SyncFailed: A Finding API call failed or was served degraded
+    """
+    window = item_response.window_size()
+    pages = window // item_response.page_size
+    search = None
+    found = {}
+    for number in range(max(size // window, 1)):
+        find_settings = item_response.find_settings(number * pages + 1)
+        search = search or item_response.store_key(find_settings)
+        find = item_response.call_ebay(
+            Finding, 'findItemsAdvanced', find_settings,
+            version=item_response.tag_version
+        )
+        if find['ack'] != 'Success' or find.get('degraded'):
+            raise SyncFailed('findItemsAdvanced failed for %s' % item_response.product)
+
+        total = int(find['paginationOutput']['totalEntries'])
+        answered = response_time(find)
+        entries = as_list(find.get('searchResult', {}).get('item'))
+        for position, item in enumerate(entries):
+            found.setdefault(item['itemId'], (number * window + position, item, answered))
+        if (number + 1) * window >= total:
+            break
+    return search, total, found
+
+def find_details(item_response, item_ids):
+    """
+    Fetch the Shopping API details of listings, skipping failed batches
+
+    Returns:
+        dict: Shopping API item per item ID
+    """
+    details = {}
+    for start in range(0, len(item_ids), DETAILS_BATCH):
+        shop = item_response.call_ebay(Shopping, 'GetMultipleItems', {
+            'ItemID': item_ids[start:start + DETAILS_BATCH],
+            'IncludeSelector': 'TextDescription',
+        })
+        if shop.get('Ack') in ('Success', 'Warning') and not shop.get('degraded'):
+            for item in as_list(shop.get('Item')):
+                details[item['ItemID']] = item
+    return details
+
+def sync_product(product, size):
+    """
+    Bring the stored listings of a product's search up to date. Listings
+    are fetched in best match order up to size, new ones and ones still
+    missing details get their Shopping API details, changed ones are
+    updated and ones no longer found are deleted. The sync is complete when
+    every listing of the search was fetched, so the store can answer any
+    sort order or filter by itself. The listing store version is bumped
+    once the sync is committed, so every process reloads its snapshot of
+    the syncs.
+
+    Parameters:
+        product (Product): Catalog product
+        size (int): Most listings stored
+
+    Returns:
+        (int, int, int, bool): Listings created, updated and deleted, and
+            whether the sync is complete
+
+    Raises:
+        SyncFailed: A Finding API call failed or was served degraded
+    """
+    request = HttpRequest()
+    request.GET = QueryDict(mutable=True)
+    request.GET['sort'] = 'best'
+    item_response = ItemResponse(request, product)
+    search, total, found = find_listings(item_response, size)
+
+    stored = {
+        listing.item_id: listing
+        for listing in StoredListing.objects.filter(product=product)
+    }
+    details = find_details(item_response, [
+        item_id for item_id in found
+        if item_id not in stored or not stored[item_id].images
+    ])
+
+    created = []
+    updated = []
+    for item_id, (rank, item, answered) in found.items():
+        listing = stored.get(item_id) or StoredListing(product=product, item_id=item_id)
+        fields = listing_fields(item, answered, rank)
+        if item_id in details:
+            fields['text'], fields['images'] = parse_details(details[item_id])
+        if listing.pk is None:
+            created.append(listing)
+        elif any(getattr(listing, name) != value for name, value in fields.items()):
+            updated.append(listing)
+        for name, value in fields.items():
+            setattr(listing, name, value)
+
+    deleted = [listing.pk for item_id, listing in stored.items() if item_id not in found]
+    complete = len(found) >= total
+    with transaction.atomic():
+        StoredListing.objects.filter(pk__in=deleted).delete()
+        StoredListing.objects.bulk_create(created, batch_size=100)
+        StoredListing.objects.bulk_update(updated, UPDATED_FIELDS, batch_size=100)
+        ListingSync.objects.update_or_create(product=product, defaults={
+            'search': search, 'synced': dj_timezone.now(), 'total': total,
+            'complete': complete,
+        })
+    bump_version('listings')
+    return len(created), len(updated), len(deleted), complete
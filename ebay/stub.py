@@ -0,0 +1,391 @@
+import os
+import re
+import ssl
+import random
+import asyncio
+import hashlib
+import threading
+import subprocess
+from collections import Counter
+from datetime import datetime, timedelta
+from xml.etree import ElementTree
+
+from aiohttp import ClientSession, web
+from ebaysdk.response import Response, ResponseDataObject
+
+FINDING_NS = 'http://www.ebay.com/marketplace/search/v1/services'
+SHOPPING_NS = 'urn:ebay:apis:eBLBaseComponents'
+LISTING_TYPES = ['Auction', 'AuctionWithBIN', 'FixedPrice']
+
+# Ebay hosts recorded responses are fetched from, per API path
+UPSTREAM = {
+    '/services/search/FindingService/v1': 'https://svcs.ebay.com',
+    '/shopping': 'https://open.api.ebay.com',
+}
+TIMESTAMP = re.compile(rb'<(timestamp|Timestamp)>([^<]*)</\1>')
+END_TIME = re.compile(rb'<endTime>([^<]*)</endTime>')
+EBAY_TIME = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+def add(parent, tag, text=None, **attrs):
+    """
+    Append a child element to an XML element
+
+    Returns:
+        Element: The new child element
+    """
+    element = ElementTree.SubElement(parent, tag, attrs)
+    if text is not None:
+        element.text = str(text)
+    return element
+
+def find_text(root, tag, default=None):
+    """
+    Get the text of the first matching element in any namespace
+    """
+    element = root.find('.//{*}%s' % tag)
+    return element.text if element is not None else default
+
+def timestamp(moment=None):
+    """
+    Get a UTC time, the current time by default, in Ebay's timestamp format
+    """
+    return (moment or datetime.utcnow()).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+def seeded(*values):
+    """
+    Get a random generator seeded from the values so the same request always
+    returns the same listings
+    """
+    seed = hashlib.sha1(':'.join(str(v) for v in values).encode()).hexdigest()
+    return random.Random(seed)
+
+def find_items(keywords, page, per_page, total):
+    """
+    Build a findItemsAdvanced response
+
+    Parameters:
+        keywords (string): Search keywords
+        page (int): Page number
+        per_page (int): Entries per page
+        total (int): Total number of matching listings to report
+
+    Returns:
+        bytes: XML response body
+    """
+    response = ElementTree.Element('findItemsAdvancedResponse', xmlns=FINDING_NS)
+    add(response, 'ack', 'Success')
+    add(response, 'timestamp', timestamp())
+    first = (page - 1) * per_page
+    count = max(0, min(per_page, total - first))
+    result = add(response, 'searchResult', count=str(count))
+
+    for index in range(first, first + count):
+        rand = seeded(keywords, index)
+        item_id = str(100000000000 + rand.randrange(10 ** 11))
+        item = add(result, 'item')
+        add(item, 'itemId', item_id)
+        add(item, 'title', '%s listing %d' % (keywords or 'Item', index + 1))
+        add(item, 'viewItemURL', 'https://www.ebay.com/itm/%s' % item_id)
+        add(item, 'location', 'Austin,TX,USA')
+
+        info = add(item, 'listingInfo')
+        add(info, 'listingType', rand.choice(LISTING_TYPES))
+        add(info, 'convertedBuyItNowPrice', '%.2f' % rand.uniform(50, 500),
+            currencyId='USD')
+
+        left = timedelta(
+            days=rand.randrange(10), hours=rand.randrange(24),
+            minutes=rand.randrange(60), seconds=rand.randrange(60)
+        )
+        add(info, 'startTime', timestamp(
+            datetime.utcnow() - timedelta(hours=rand.randrange(1, 24 * 30))
+        ))
+        add(info, 'endTime', timestamp(datetime.utcnow() + left))
+
+        status = add(item, 'sellingStatus')
+        add(status, 'convertedCurrentPrice', '%.2f' % rand.uniform(10, 400),
+            currencyId='USD')
+        add(status, 'timeLeft', 'P%dDT%dH%dM%dS' % (
+            left.days, left.seconds // 3600, left.seconds // 60 % 60,
+            left.seconds % 60
+        ))
+
+        shipping = add(item, 'shippingInfo')
+        add(shipping, 'shippingServiceCost', rand.choice(['0.0', '4.99', '9.5']),
+            currencyId='USD')
+        add(add(item, 'condition'), 'conditionId',
+            rand.choice(['1000', '1500', '2000', '2500', '3000']))
+
+        seller = add(item, 'sellerInfo')
+        add(seller, 'sellerUserName', 'seller%d' % rand.randrange(1000))
+        add(seller, 'feedbackScore', rand.randrange(10, 5000))
+        add(seller, 'positiveFeedbackPercent', '%.1f' % rand.uniform(95, 100))
+
+    pagination = add(response, 'paginationOutput')
+    add(pagination, 'pageNumber', page)
+    add(pagination, 'entriesPerPage', per_page)
+    add(pagination, 'totalPages', -(-total // per_page))
+    add(pagination, 'totalEntries', total)
+    return ElementTree.tostring(response, encoding='utf-8')
+
+def get_multiple_items(item_ids):
+    """
+    Build a GetMultipleItems response
+
+    Parameters:
+        item_ids ([string]): Ebay item IDs
+
+    Returns:
+        bytes: XML response body
+    """
+    response = ElementTree.Element('GetMultipleItemsResponse', xmlns=SHOPPING_NS)
+    add(response, 'Timestamp', timestamp())
+    add(response, 'Ack', 'Success')
+
+    for item_id in item_ids:
+        rand = seeded(item_id)
+        item = add(response, 'Item')
+        add(item, 'ItemID', item_id)
+        add(item, 'Description', 'Description of item %s. ' % item_id * 5)
+        add(item, 'GalleryURL',
+            'https://i.ebayimg.com/thumbs/images/g/%s0/s-l140.jpg' % item_id)
+        # Older listings name picture sizes with a code
+        coded = rand.random() < 0.3
+        for picture in range(rand.randrange(1, 6)):
+            if coded:
+                url = 'https://i.ebayimg.com/00/s/MTYwMFgxMjAw/z/%s%d/$_57.JPG?set_id=8800005007'
+            else:
+                url = 'https://i.ebayimg.com/images/g/%s%d/s-l1600.jpg'
+            add(item, 'PictureURL', url % (item_id, picture))
+    return ElementTree.tostring(response, encoding='utf-8')
+
+def failure(verb):
+    """
+    Build a response Ebay sends when it refuses a request
+
+    Parameters:
+        verb (string): Ebay API search type
+
+    Returns:
+        bytes: XML response body
+    """
+    if verb == 'findItemsAdvanced':
+        response = ElementTree.Element('findItemsAdvancedResponse', xmlns=FINDING_NS)
+        add(response, 'ack', 'Failure')
+        add(response, 'timestamp', timestamp())
+        error = add(add(response, 'errorMessage'), 'error')
+        add(error, 'errorId', '10001')
+        add(error, 'message', 'Injected stub failure')
+    else:
+        response = ElementTree.Element('%sResponse' % verb, xmlns=SHOPPING_NS)
+        add(response, 'Timestamp', timestamp())
+        add(response, 'Ack', 'Failure')
+        error = add(response, 'Errors')
+        add(error, 'ErrorCode', '10001')
+        add(error, 'ShortMessage', 'Injected stub failure')
+    return ElementTree.tostring(response, encoding='utf-8')
+
+def parse(api, verb, body):
+    """
+    Parse a response body into the dictionary Ebaysdk would return
+
+    Parameters:
+        api: Ebaysdk connection method
+        verb (string): Ebay API search type
+        body (bytes): XML response body
+
+    Returns:
+        dict: Ebay response data
+    """
+    connection = api(appid='stub', config_file=None)
+    response = Response(
+        ResponseDataObject({'content': body}, []), verb=verb,
+        list_nodes=connection.base_list_nodes
+    )
+    return response.dict()
+
+class Recordings:
+    """
+    Ebay responses recorded to a directory, one file per request body, so
+    real listings can be served offline. Missing responses are fetched from
+    Ebay and recorded when recording is enabled.
+
+    Attributes:
+        directory (string): Directory responses are stored in
+        record (bool): Whether missing responses are fetched from Ebay
+    """
+
+    def __init__(self, directory, record=False):
+        self.directory = directory
+        self.record = record
+
+    def path(self, verb, body):
+        return os.path.join(
+            self.directory, verb, '%s.xml' % hashlib.sha1(body).hexdigest()
+        )
+
+    def load(self, verb, body):
+        """
+        Get the recorded response to a request, answered at the current time
+        so it is as fresh as a live response. Listing end times move by as
+        much, so listings have as long left as when they were recorded.
+
+        Returns:
+            bytes: XML response body or None
+        """
+        try:
+            with open(self.path(verb, body), 'rb') as recorded:
+                response = recorded.read()
+        except FileNotFoundError:
+            return None
+
+        now = datetime.utcnow()
+        match = TIMESTAMP.search(response)
+        try:
+            shift = now - datetime.strptime(match.group(2).decode(), EBAY_TIME)
+        except (AttributeError, ValueError):
+            shift = timedelta()
+
+        response = END_TIME.sub(
+            lambda match: b'<endTime>%s</endTime>' % timestamp(
+                datetime.strptime(match.group(1).decode(), EBAY_TIME) + shift
+            ).encode(), response
+        )
+        return TIMESTAMP.sub(
+            lambda match: b'<%s>%s</%s>' % (
+                match.group(1), timestamp(now).encode(), match.group(1)
+            ), response
+        )
+
+    async def fetch(self, request, verb, body):
+        """
+        Call Ebay with the request and record its response
+
+        Returns:
+            bytes: XML response body
+        """
+        headers = {
+            name: value for name, value in request.headers.items()
+            if name.lower() not in ('host', 'content-length')
+        }
+        async with ClientSession() as session:
+            async with session.post(
+                UPSTREAM[request.path] + request.path, data=body, headers=headers
+            ) as upstream:
+                upstream.raise_for_status()
+                response = await upstream.read()
+
+        path = self.path(verb, body)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as recorded:
+            recorded.write(response)
+        return response
+
+def create_app(
+    total=200, latency=0, jitter=0, error_rate=0, failure_rate=0,
+    recordings=None
+):
+    """
+    Create a web application answering Finding and Shopping API requests
+    with recorded or synthetic listings. Responses can be delayed and
+    errors injected at random to reproduce a slow or failing Ebay. Calls
+    answered are counted per API method in app['calls'].
+
+    Parameters:
+        total (int): Total number of listings reported for every search
+        latency (float): Seconds every response is delayed
+        jitter (float): Extra random delay of up to this many seconds
+        error_rate (float): Share of requests answered with HTTP 503
+        failure_rate (float): Share of requests answered with a Failure ack
+        recordings (Recordings): Recorded responses served when found
+
+    Returns:
+        Application: aiohttp web application
+    """
+    async def answer(request, verb, synthetic):
+        calls[verb] += 1
+        delay = latency + random.uniform(0, jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if random.random() < error_rate:
+            calls['errors'] += 1
+            return web.Response(status=503, text='Injected stub error')
+        if random.random() < failure_rate:
+            calls['failures'] += 1
+            return web.Response(body=failure(verb), content_type='text/xml')
+
+        body = await request.read()
+        response = recordings and recordings.load(verb, body)
+        if response is None and recordings and recordings.record:
+            response = await recordings.fetch(request, verb, body)
+        if response is None:
+            response = synthetic(ElementTree.fromstring(body))
+        return web.Response(body=response, content_type='text/xml')
+
+    async def finding(request):
+        return await answer(request, 'findItemsAdvanced', lambda root: find_items(
+            find_text(root, 'keywords', ''), int(find_text(root, 'pageNumber', 1)),
+            int(find_text(root, 'entriesPerPage', 20)), total
+        ))
+
+    async def shopping(request):
+        return await answer(request, 'GetMultipleItems', lambda root: get_multiple_items(
+            [element.text for element in root.findall('.//{*}ItemID')]
+        ))
+
+    calls = Counter()
+    app = web.Application()
+    app['calls'] = calls
+    app.router.add_post('/services/search/FindingService/v1', finding)
+    app.router.add_post('/shopping', shopping)
+    return app
+
+def create_certificate(directory):
+    """
+    Create a self-signed certificate for 127.0.0.1 and localhost with the
+    openssl command line tool
+
+    Parameters:
+        directory (string): Directory the certificate and key are written to
+
+    Returns:
+        (string, string): Certificate and private key paths
+    """
+    cert = os.path.join(directory, 'stub.crt')
+    key = os.path.join(directory, 'stub.key')
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+        '-subj', '/CN=localhost', '-keyout', key, '-out', cert,
+        '-addext', 'subjectAltName=IP:127.0.0.1,DNS:localhost',
+    ], check=True, capture_output=True)
+    return cert, key
+
+def ssl_context(cert, key):
+    """
+    Returns:
+        SSLContext: Server context serving the certificate
+    """
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    return context
+
+def serve_in_thread(app, host='127.0.0.1', port=0, context=None):
+    """
+    Serve an application from an event loop running in a daemon thread
+
+    Parameters:
+        app (Application): aiohttp web application
+        host (string): Host to listen on
+        port (int): Port to listen on, any free port by default
+        context (SSLContext): Server context to serve HTTPS with
+
+    Returns:
+        string: Domain the application is served on
+    """
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app, access_log=None)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, host, port, ssl_context=context)
+    loop.run_until_complete(site.start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return '%s:%d' % runner.addresses[0][:2]
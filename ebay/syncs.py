@@ -0,0 +1,44 @@
+from threading import Lock
+
+from core.versions import get_version
+
+from .models import ListingSync
+
+syncs = None
+syncs_lock = Lock()
+
+class Syncs(dict):
+    """
+    Snapshot of the listing store's syncs, so requests check whether the
+    store answers them without querying it
+
+    Attributes:
+        version (int): Listing store version the snapshot was built from
+    """
+
+    def __init__(self, version):
+        super(Syncs, self).__init__(
+            (product_id, (search, synced, complete))
+            for product_id, search, synced, complete in ListingSync.objects.values_list(
+                'product_id', 'search', 'synced', 'complete'
+            )
+        )
+        self.version = version
+
+def get_syncs():
+    """
+    Get the sync snapshot, building it when it is missing or older than the
+    current listing store version
+
+    Returns:
+        Syncs: Search key, sync time and completeness per product id
+    """
+    global syncs
+    version = get_version('listings')
+    current = syncs
+    if current is None or current.version != version:
+        with syncs_lock:
+            if syncs is current:
+                syncs = Syncs(version)
+            current = syncs
+    return current
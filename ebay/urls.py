@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import quota
+
+urlpatterns = [
+    path('quota', quota, name='ebay_quota'),
+]
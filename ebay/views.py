@@ -0,0 +1,16 @@
+from django.http import JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
+
+from . import breaker
+from .quota import get_counters
+
+@staff_member_required
+def quota(request):
+    """
+    Report today's Ebay call counters and circuit state per API method for
+    monitoring
+    """
+    counters = get_counters(request.GET.get('day'))
+    for method, values in counters['methods'].items():
+        values['circuit'] = breaker.state(method)
+    return JsonResponse(counters)
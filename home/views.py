@@ -1,14 +1,17 @@
 from django.views.generic.base import TemplateView
 
-from products.models import Category, Product
+from products.catalog import get_catalog
 
 class HomePage(TemplateView):
     template_name = 'home/home.html'
 
     def get_context_data(self, **kwargs):
         context = super(HomePage, self).get_context_data(**kwargs)
-        context['categories'] = Category.objects.filter(
-            parent=None, featured=True
+        catalog = get_catalog()
+        context['categories'] = [
+            category for category in catalog.categories.roots if category.featured
+        ]
+        context['product_groups'] = catalog.group_by_root(
+            [product for product in catalog.products.nodes if product.featured]
         )
-        context['products'] = Product.objects.filter(featured=True)
         return context
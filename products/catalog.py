@@ -0,0 +1,224 @@
+import time
+from threading import Lock
+
+from django.conf import settings as dj_settings
+
+from core.versions import get_version
+
+from .models import Category, Product
+
+catalog = None
+catalog_lock = Lock()
+
+class Branch:
+    """
+    Node of a nested tree rendered by the tree templates
+
+    Attributes:
+        node (MPTTModel): Category or product
+        children ([Branch]): Child branches
+    """
+
+    __slots__ = ('node', 'children')
+
+    def __init__(self, node, children):
+        self.node = node
+        self.children = children
+
+class Tree:
+    """
+    Immutable snapshot of an MPTT tree. Nodes are stored in tree order with
+    their lft, rght and level values so relatives are found by slicing
+    instead of querying.
+
+    Attributes:
+        nodes (tuple): Nodes ordered by tree_id and lft
+        roots (tuple): Root nodes
+    """
+
+    def __init__(self, nodes):
+        self.nodes = tuple(nodes)
+        self.lft = tuple(node.lft for node in self.nodes)
+        self.rght = tuple(node.rght for node in self.nodes)
+        self.level = tuple(node.level for node in self.nodes)
+        self.position = {node.id: index for index, node in enumerate(self.nodes)}
+        self.by_id = {node.id: node for node in self.nodes}
+        self.by_slug = {node.slug: node for node in self.nodes}
+
+        children = {}
+        for node in self.nodes:
+            children.setdefault(node.parent_id, []).append(node)
+        self.child_nodes = {key: tuple(value) for key, value in children.items()}
+        self.roots = self.child_nodes.get(None, ())
+
+    def get(self, slug):
+        """
+        Get a node by slug
+
+        Returns:
+            MPTTModel: Node or None
+        """
+        return self.by_slug.get(slug)
+
+    def children(self, node):
+        """
+        Get the direct children of a node
+
+        Returns:
+            tuple: Child nodes
+        """
+        return self.child_nodes.get(node.id, ())
+
+    def ancestors(self, node, include_self=False):
+        """
+        Get the ancestors of a node from the root down
+
+        Returns:
+            [MPTTModel]: Ancestor nodes
+        """
+        ancestors = [node] if include_self else []
+        parent_id = node.parent_id
+        while parent_id is not None:
+            parent = self.by_id[parent_id]
+            ancestors.append(parent)
+            parent_id = parent.parent_id
+        ancestors.reverse()
+        return ancestors
+
+    def descendants(self, node, include_self=False):
+        """
+        Get the descendants of a node in tree order
+
+        Returns:
+            tuple: Descendant nodes
+        """
+        index = self.position[node.id]
+        start = index if include_self else index + 1
+        return self.nodes[start:index + 1 + (self.rght[index] - self.lft[index]) // 2]
+
+    def family(self, node):
+        """
+        Get the ancestors, the node itself and its descendants
+
+        Returns:
+            [MPTTModel]: Family nodes in tree order
+        """
+        return self.ancestors(node) + list(self.descendants(node, include_self=True))
+
+    def root(self, node):
+        """
+        Get the root of a node's tree
+
+        Returns:
+            MPTTModel: Root node
+        """
+        return self.ancestors(node, include_self=True)[0]
+
+    def branches(self, nodes):
+        """
+        Nest nodes under their parents. Nodes whose parent is not among the
+        given nodes become top level branches.
+
+        Parameters:
+            nodes ([MPTTModel]): Nodes in tree order
+
+        Returns:
+            [Branch]: Top level branches
+        """
+        ids = {node.id for node in nodes}
+
+        def branch(node):
+            return Branch(node, [
+                branch(child) for child in self.children(node) if child.id in ids
+            ])
+
+        return [branch(node) for node in nodes if node.parent_id not in ids]
+
+class Catalog:
+    """
+    Versioned snapshot of the category and product trees used by the
+    catalog pages and breadcrumbs
+
+    Attributes:
+        version (int): Catalog version the snapshot was built from
+        built (float): Time the snapshot was built
+        categories (Tree): Category tree
+        products (Tree): Product tree, with each product's category attached
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.built = time.time()
+        self.categories = Tree(Category.objects.order_by('tree_id', 'lft'))
+
+        products = list(Product.objects.order_by('tree_id', 'lft'))
+        category_products = {}
+        for product in products:
+            product.category = self.categories.by_id[product.category_id]
+            category_products.setdefault(product.category_id, []).append(product)
+        self.products = Tree(products)
+        self.category_products = {
+            key: tuple(value) for key, value in category_products.items()
+        }
+
+    def products_in(self, category):
+        """
+        Get the products of a category in tree order
+
+        Returns:
+            tuple: Products of the category
+        """
+        return self.category_products.get(category.id, ())
+
+    def group_by_root(self, products):
+        """
+        Group consecutive products by the root of their category
+
+        Parameters:
+            products ([Product]): Products in tree order
+
+        Returns:
+            [dict]: Groups with the root category as grouper and a list of
+                products
+        """
+        groups = []
+        for product in products:
+            root = self.categories.root(product.category)
+            if groups and groups[-1]['grouper'] is root:
+                groups[-1]['list'].append(product)
+            else:
+                groups.append({'grouper': root, 'list': [product]})
+        return groups
+
+    def get_product(self, category_slug, slug):
+        """
+        Get a product by its category slug and slug
+
+        Returns:
+            Product: Product or None
+        """
+        product = self.products.get(slug)
+        if product and product.category.slug == category_slug:
+            return product
+        return None
+
+def get_catalog():
+    """
+    Get the catalog snapshot, building it when it is missing, older than the
+    current catalog version or older than CATALOG_TTL
+
+    Returns:
+        Catalog: Catalog snapshot
+    """
+    global catalog
+    version = get_version('catalog')
+    current = catalog
+    if (
+        current is None or current.version != version or
+        time.time() - current.built > dj_settings.CATALOG_TTL
+    ):
+        with catalog_lock:
+            if catalog is current:
+                catalog = Catalog(version)
+            current = catalog
+    return current
@@ -0,0 +1,119 @@
+import os
+import logging
+from io import BytesIO
+from functools import partial
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from django.conf import settings as dj_settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+def build_variants(image):
+    """
+    Generate smaller WebP copies of an uploaded image next to it in the
+    image's storage, so local media and Cloudinary storage both work.
+    Images are never enlarged.
+
+    Parameters:
+        image (FieldFile): Uploaded image
+
+    Returns:
+        dict: Source image name and width, and each variant's width and
+            storage name
+    """
+    try:
+        with image.open('rb'):
+            source = Image.open(image)
+            source.load()
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as error:
+        logger.warning('Image variants of %s not built: %s', image.name, error)
+        return {'source': image.name, 'width': None, 'variants': []}
+
+    source = ImageOps.exif_transpose(source)
+    if source.mode not in ('RGB', 'RGBA'):
+        source = source.convert('RGBA' if 'transparency' in source.info else 'RGB')
+
+    width, height = source.size
+    directory, filename = os.path.split(image.name)
+    stem = os.path.splitext(filename)[0]
+    variants = []
+    for target in dj_settings.IMAGE_VARIANT_WIDTHS:
+        if target >= width:
+            break
+        variant = source.resize(
+            (target, max(round(height * target / width), 1)), Image.LANCZOS
+        )
+        data = BytesIO()
+        variant.save(data, 'WEBP', quality=dj_settings.IMAGE_VARIANT_QUALITY, method=6)
+        name = image.storage.save(
+            '%s/variants/%s-%dw.webp' % (directory, stem, target),
+            ContentFile(data.getvalue())
+        )
+        variants.append([target, name])
+    return {'source': image.name, 'width': width, 'variants': variants}
+
+def delete_variants(storage, variants):
+    """
+    Delete the variant files of an image that was replaced or removed,
+    logging the files that can't be deleted
+    """
+    for width, name in variants.get('variants', []):
+        try:
+            storage.delete(name)
+        except Exception as error:
+            logger.warning('Image variant %s not deleted: %s', name, error)
+
+def discard_variants(storage, variants):
+    """
+    Delete the variant files of an image once the current transaction is
+    committed, so a rolled back edit keeps the variants it refers to
+    """
+    if variants and variants.get('variants'):
+        transaction.on_commit(partial(delete_variants, storage, variants))
+
+def update_variants(instance, force=False):
+    """
+    Rebuild the image variants of a category or product when its image
+    changed since they were built
+
+    Parameters:
+        instance (Category or Product): Saved catalog node
+        force (bool): Rebuild even if the image is unchanged
+
+    Returns:
+        bool: Whether the variants changed
+    """
+    image = instance.image
+    current = instance.image_variants or {}
+    if not force and current.get('source') == (image.name or None):
+        return False
+
+    discard_variants(image.storage, current)
+    variants = build_variants(image) if image else {}
+    type(instance).objects.filter(pk=instance.pk).update(image_variants=variants)
+    instance.image_variants = variants
+    return True
+
+def srcset(image, variants):
+    """
+    Get the candidate URLs of an image for the srcset attribute, the
+    variants first, then the source image when its width is known
+
+    Parameters:
+        image (FieldFile): Uploaded image
+        variants (dict): Variants built for the image
+
+    Returns:
+        [(string, int)]: URLs and their widths, narrowest first
+    """
+    if variants.get('source') != image.name:
+        return []
+    candidates = [
+        (image.storage.url(name), width) for width, name in variants['variants']
+    ]
+    if candidates and variants['width']:
+        candidates.append((image.url, variants['width']))
+    return candidates
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core.versions import bump_version
+from products.images import update_variants
+from products.models import Category, Product
+
+class Command(BaseCommand):
+    help = (
+        'Build the responsive image variants of categories and products whose '
+        'image has none yet or changed'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true', help='Rebuild every image\'s variants'
+        )
+
+    def handle(self, *args, **options):
+        built = 0
+        for model in [Category, Product]:
+            for instance in model.objects.exclude(image='').exclude(image=None):
+                if update_variants(instance, options['force']):
+                    built += 1
+                    self.stdout.write('%s: %s' % (
+                        instance, len(instance.image_variants['variants'])
+                    ))
+        if built:
+            bump_version('catalog')
+        self.stdout.write('Built the variants of %d images' % built)
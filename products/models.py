@@ -13,6 +13,7 @@ class Category(MPTTModel):
     slug = models.SlugField(max_length=150, unique=True)
     nickname = models.CharField(max_length=50, blank=True)
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     ebay_cat = models.CharField(max_length=25)
     featured = models.BooleanField(default=False)
 
@@ -35,6 +36,7 @@ class Product(MPTTModel):
     slug = models.SlugField(max_length=150, unique=True)
     nickname = models.CharField(max_length=50, blank=True)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     query = models.CharField(max_length=100, blank=True)
     aspects = models.ManyToManyField(Aspect, blank=True)
     filters = models.ManyToManyField(Filter, blank=True)
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+
+from core.versions import bump_version
+
+from .images import discard_variants, update_variants
+from .models import Category, Product
+
+def invalidate_catalog(**kwargs):
+    """
+    Mark the catalog snapshot as outdated after a catalog edit
+    """
+    bump_version('catalog')
+
+def refresh_image_variants(instance, **kwargs):
+    """
+    Build the responsive variants of a saved node's image when it changed
+    """
+    if update_variants(instance):
+        bump_version('catalog')
+
+def remove_image_variants(instance, **kwargs):
+    """
+    Delete the variant files of a deleted node's image
+    """
+    discard_variants(instance.image.storage, instance.image_variants)
+
+for model in [Category, Product]:
+    post_save.connect(refresh_image_variants, sender=model)
+    post_delete.connect(remove_image_variants, sender=model)
+    post_save.connect(invalidate_catalog, sender=model)
+    post_delete.connect(invalidate_catalog, sender=model)
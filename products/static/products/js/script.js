@@ -4,21 +4,23 @@ $(function() {
     $('#filter-form').submit();
   });
 
-  // don't submit keywords if empty
+  // don't submit keywords or prices if empty
   $('#filter-form').submit(function() {
-    if (!$('#keyword-filter').val()) {
-      $('#keyword-filter').attr('name', '');
-    }
+    $('#keyword-filter, .price-filter').each(function() {
+      if (!$(this).val()) {
+        $(this).attr('name', '');
+      }
+    });
   });
 
   // update filter form with url params
   $.each(query, function(key, lst) {
     $.each(lst, function(idx, val) {
       if ($('[name=' + key + ']').is('input[type="checkbox"]')) {
-        $('[value=' + val + ']').prop('checked', true);
+        $('[name=' + key + '][value=' + val + ']').prop('checked', true);
       } else if ($('[name=' + key + ']').is('select')) {
         $('[value=' + val + ']').prop('selected', true);
-      } else if ($('[name=' + key + ']').is('input[type="search"]')) {
+      } else if ($('[name=' + key + ']').is('input[type="search"], input[type="number"]')) {
         $('input[name=' + key + ']').val(val);
       }
     });
@@ -57,6 +59,7 @@ $(function() {
     // add carousel to new items
     $(document).ajaxStop(function() {
       $('.item-gallery:not(.slick-slider)').slick({
+        lazyLoad: 'ondemand',
         prevArrow: '<div class="slick-prev"><img src="/static/img/arrow.png" /></div>',
         nextArrow: '<div class="slick-next"><img src="/static/img/arrow.png" /></div>',
       });
@@ -90,8 +93,29 @@ $(function() {
     $(this).parent().find('.text-btn').html('Show Text');
   });
 
-  // item image gallery
+  // count down to the end of listings from their end time, so pages served
+  // from the cache show the time left now
+  function countdown() {
+    var now = Date.now() / 1000;
+    $('.item-end[data-end]').each(function() {
+      var left = Math.floor($(this).data('end') - now);
+      if (left <= 0) {
+        $(this).text('Ended');
+        return;
+      }
+      $(this).text(
+        Math.floor(left / 86400) + 'd ' + Math.floor(left % 86400 / 3600) + 'h ' +
+        Math.floor(left % 3600 / 60) + 'm ' + left % 60 + 's'
+      );
+    });
+  }
+  countdown();
+  setInterval(countdown, 1000);
+
+  // item image gallery, loading pictures after the first when the carousel
+  // reaches them
   $('.item-gallery').slick({
+    lazyLoad: 'ondemand',
     prevArrow: '<div class="slick-prev"><img src="/static/img/arrow.png" /></div>',
     nextArrow: '<div class="slick-next"><img src="/static/img/arrow.png" /></div>',
   });
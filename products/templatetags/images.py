@@ -0,0 +1,42 @@
+from django import template
+from django.conf import settings as dj_settings
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from products.images import srcset
+
+register = template.Library()
+
+@register.simple_tag
+def responsive_image(node, sizes=None, loading='lazy'):
+    """
+    Render the image of a category or product with its smaller variants in
+    srcset, loaded lazily unless told otherwise
+
+    Parameters:
+        node (Category or Product): Catalog node
+        sizes (string): Sizes attribute, IMAGE_SIZES by default
+        loading (string): 'lazy' or 'eager'
+
+    Returns:
+        string: img element
+    """
+    if not node.image:
+        return format_html(
+            "<img src='{}' alt='' loading='{}' />", static('img/noimage.png'), loading
+        )
+
+    candidates = srcset(node.image, node.image_variants)
+    if not candidates:
+        return format_html(
+            "<img src='{}' alt='{}' loading='{}' decoding='async' />",
+            node.image.url, node, loading
+        )
+    # Browsers without srcset get the widest variant
+    widest = candidates[len(node.image_variants['variants']) - 1][0]
+    return format_html(
+        "<img src='{}' srcset='{}' sizes='{}' alt='{}' loading='{}' decoding='async' />",
+        widest,
+        ', '.join('%s %dw' % candidate for candidate in candidates),
+        sizes or dj_settings.IMAGE_SIZES, node, loading
+    )
@@ -0,0 +1,19 @@
+from django import template
+
+from ebay.listings import time_left
+
+register = template.Library()
+
+@register.filter
+def countdown(end):
+    """
+    Format the time left before a listing ends when the page is rendered.
+    Script keeps counting down from the end time in the page.
+
+    Parameters:
+        end (int): Listing end time in seconds since the epoch
+
+    Returns:
+        string: Time left, or Ended
+    """
+    return time_left(end) or 'Ended'
@@ -1,53 +1,171 @@
 import json
+import hashlib
 
+from asgiref.sync import sync_to_async
+
+from django.conf import settings as dj_settings
 from django.views.generic import list, detail
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.template import loader
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.utils.safestring import mark_safe
 
-from refinements.models import Filter
+from core.metrics import phase
+from core.versions import get_build_id
+from refinements.index import get_index
+from ebay.cache import get_cache
 from ebay.items import ItemResponse
 
-from .models import Category, Product
+from .catalog import get_catalog
+
+def make_etag(*parts):
+    """
+    Build a strong entity tag from the data a response was rendered from and
+    the build rendering it
+
+    Returns:
+        string: Quoted entity tag
+    """
+    data = json.dumps((get_build_id(),) + parts, separators=(',', ':'))
+    return quote_etag(hashlib.sha1(data.encode()).hexdigest())
+
+def conditional(request, etag, respond):
+    """
+    Answer a request with 304 Not Modified when the client already has the
+    current version of the response, otherwise build it. Responses must be
+    revalidated before they are reused, so browsers and caches always ask.
+
+    Parameters:
+        request (HttpRequest): Current HTTP Request object
+        etag (string): Entity tag of the current version, or None when the
+            response can't be versioned
+        respond (function): Builds the full response
+
+    Returns:
+        HttpResponse: Not modified or full response
+    """
+    if etag is None:
+        return respond()
+    response = get_conditional_response(request, etag=etag) or respond()
+    response.headers['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+def render_results(items):
+    """
+    Render the results fragment of a page of listings. Versioned listings
+    render the same way every time, so the fragment is cached alongside
+    them and only rendered again when they or the build change.
+
+    Parameters:
+        items (dict): Item count and listings
+
+    Returns:
+        SafeString: Rendered results
+    """
+    version = items.get('version')
+    if version is None:
+        with phase('render'):
+            return loader.render_to_string('products/results.html', {'items': items})
+
+    key = 'html:results:%s' % hashlib.sha1(
+        ('%s|%s' % (get_build_id(), version)).encode()
+    ).hexdigest()
+    html = get_cache().get(key)
+    if html is None:
+        with phase('render'):
+            html = loader.render_to_string('products/results.html', {'items': items})
+        get_cache().set(key, str(html), dj_settings.EBAY_CACHE_TTL)
+    return mark_safe(html)
 
 class CategoryList(list.ListView):
-    model = Category
     template_name = 'products/categories.html'
     context_object_name = 'categories'
 
     def get_queryset(self):
-        return super(CategoryList, self).get_queryset().filter(parent=None)
+        return get_catalog().categories.roots
 
 class CategoryPage(detail.DetailView):
-    model = Category
     template_name = 'products/category.html'
     context_object_name = 'category'
 
+    def get_object(self, queryset=None):
+        category = get_catalog().categories.get(self.kwargs['slug'])
+        if category is None:
+            raise Http404('No category found matching the query')
+        return category
+
     def get_context_data(self, **kwargs):
         context = super(CategoryPage, self).get_context_data(**kwargs)
-        context['children'] = self.object.get_descendants()
-        context['products'] = Product.objects.filter(
-            category__slug=self.kwargs['slug']
+        catalog = get_catalog()
+        categories = catalog.categories
+        context['ancestors'] = categories.ancestors(self.object)
+        context['children'] = categories.branches(
+            categories.descendants(self.object)
+        )
+        context['products'] = catalog.products.branches(
+            catalog.products_in(self.object)
         )
         return context
 
 class ProductPage(detail.DetailView):
-    model = Product
     template_name = 'products/product.html'
     context_object_name = 'product'
 
+    def get_object(self, queryset=None):
+        product = get_catalog().get_product(self.kwargs['category'], self.kwargs['slug'])
+        if product is None:
+            raise Http404('No product found matching the query')
+        return product
+
+    async def get(self, request, *args, **kwargs):
+        self.object = await sync_to_async(self.get_object)()
+        item_response = await sync_to_async(ItemResponse)(request, self.object)
+        items = await item_response.aget_items()
+        etag = await sync_to_async(self.get_etag)(items)
+
+        def respond():
+            context = self.get_context_data(object=self.object)
+            context['items'] = items
+            context['results'] = render_results(items)
+            with phase('render'):
+                return self.render_to_response(context).render()
+
+        return await sync_to_async(conditional)(request, etag, respond)
+
+    def get_etag(self, items):
+        """
+        Get the entity tag of the page, which changes with the catalog, the
+        product's refinements, the query and the listings shown
+
+        Returns:
+            string: Entity tag, or None when the listings aren't versioned
+        """
+        if items.get('version') is None:
+            return None
+        return make_etag(
+            get_catalog().version, get_index(self.object).version,
+            self.request.get_full_path(), items['version']
+        )
+
     def get_context_data(self, **kwargs):
         context = super(ProductPage, self).get_context_data(**kwargs)
-        context['models'] = self.object.get_children()
-        context['filters'] = Filter.objects.filter(
-            product__in=self.object.get_family()
-        ).distinct()
-        context['items'] = ItemResponse(self.request, self.object).get_items()
+        catalog = get_catalog()
+        context['category_ancestors'] = catalog.categories.ancestors(
+            self.object.category
+        )
+        context['ancestors'] = catalog.products.ancestors(self.object)
+        index = get_index(self.object)
+        context['models'] = index.models
+        context['filters'] = index.filters
         context['query'] = json.dumps(dict(self.request.GET))
         return context
 
-def ajax(request, category, slug):
+async def ajax(request, category, slug):
     """
-    Pull new page of Ebay items on load button press
+    Pull new page of Ebay items on load button press. The pages parameter
+    asks for several consecutive pages at once.
 
     Parameters:
         request (HttpRequest): Current HTTP Request object
@@ -55,12 +173,26 @@ def ajax(request, category, slug):
         slug (string): Product url string
 
     Returns:
-        JsonResponse: Next page of Ebay listings
+        JsonResponse: Next pages of Ebay listings, or 304 Not Modified when the
+            client already has it
     """
-    items = ItemResponse(request, Product.objects.get(
-        category__slug=category, slug=slug
-    )).get_items()
-    items_html = loader.render_to_string(
-        'products/results.html', {'items': items}
-    )
-    return JsonResponse({'items_html': items_html})
+    catalog = await sync_to_async(get_catalog)()
+    product = catalog.get_product(category, slug)
+    if product is None:
+        raise Http404('No product found matching the query')
+    try:
+        pages = int(request.GET.get('pages', 1))
+    except ValueError:
+        pages = 1
+    item_response = await sync_to_async(ItemResponse)(request, product, pages)
+    items = await item_response.aget_items()
+    etag = None
+    if items.get('version') is not None:
+        etag = make_etag('ajax', items['version'])
+
+    def respond():
+        return JsonResponse({
+            'items_html': render_results(items)
+        })
+
+    return await sync_to_async(conditional)(request, etag, respond)
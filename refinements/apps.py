@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class RefinementsConfig(AppConfig):
     name = 'refinements'
+
+    def ready(self):
+        from . import signals
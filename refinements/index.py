@@ -0,0 +1,186 @@
+import time
+from threading import Lock
+
+from django.conf import settings as dj_settings
+
+from core.versions import get_version
+
+from .models import Aspect, Filter
+
+# Indexes built by this process, keyed on product id
+indexes = {}
+indexes_lock = Lock()
+
+def compile_aspect(aspect):
+    """
+    Build the strict and loose aspectFilter entries for an aspect
+
+    Parameters:
+        aspect (Aspect): Aspect object
+
+    Returns:
+        (dict, dict): Entries used for strict and non-strict searches
+    """
+    values = aspect.value.split('|')
+    strict = {'aspectName': aspect.name, 'aspectValueName': values}
+    if aspect.is_strict:
+        return strict, strict
+    return strict, {'aspectName': aspect.name, 'aspectValueName': values + ['Not Specified']}
+
+class RefinementIndex:
+    """
+    Precompiled refinements of a product, answering which filters, query
+    fragments and aspect filters apply to a request without database queries
+
+    Attributes:
+        version (int): Refinements version the index was built from
+        built (float): Time the index was built
+        models ([Product]): Child products offered as model choices
+        filters ([Filter]): Filters offered for the product family
+    """
+
+    def __init__(self, product, version):
+        self.version = version
+        self.built = time.time()
+        self.query = product.query
+
+        self.models = list(product.get_children())
+        self.filters = list(
+            Filter.objects.filter(product__in=product.get_family())
+            .select_related('group').distinct()
+        )
+        self.filter_lookup = {
+            (each_filter.group.slug, each_filter.slug): each_filter
+            for each_filter in self.filters
+        }
+
+        aspects = {}
+        for aspect in Aspect.objects.filter(
+            product__in=product.get_ancestors(include_self=True)
+        ).distinct():
+            aspects[aspect.id] = aspect
+        self.base_aspects = list(aspects)
+
+        self.model_lookup = {}
+        for model in product.get_descendants().prefetch_related('aspects'):
+            ids = []
+            for aspect in model.aspects.all():
+                aspects[aspect.id] = aspect
+                ids.append(aspect.id)
+            self.model_lookup[model.slug] = (model.query, ids)
+
+        self.filter_aspects = {each_filter.id: [] for each_filter in self.filters}
+        for link in Filter.aspects.through.objects.filter(
+            filter__in=self.filters
+        ).select_related('aspect'):
+            aspects[link.aspect_id] = link.aspect
+            self.filter_aspects[link.filter_id].append(link.aspect_id)
+
+        self.aspect_order = {
+            aspect.id: position for position, aspect in enumerate(
+                sorted(aspects.values(), key=lambda a: (a.name, a.value))
+            )
+        }
+        self.aspects = {
+            aspect_id: compile_aspect(aspect) for aspect_id, aspect in aspects.items()
+        }
+
+    def get_filters(self, params):
+        """
+        Get the filters selected by request parameters
+
+        Parameters:
+            params (QueryDict): Request GET parameters
+
+        Returns:
+            [Filter]: List of filters in display order
+        """
+        selected = {
+            self.filter_lookup[(key, value)]
+            for key, values in params.lists() for value in values
+            if (key, value) in self.filter_lookup
+        }
+        return [each_filter for each_filter in self.filters if each_filter in selected]
+
+    def get_models(self, slugs):
+        """
+        Get the query and aspect ids of the selected model slugs
+
+        Parameters:
+            slugs ([string]): Model product slugs
+
+        Returns:
+            [(string, [int])]: Query and aspect ids per selected model
+        """
+        selected = set(slugs)
+        return [model for slug, model in self.model_lookup.items() if slug in selected]
+
+    def get_query(self, models, filters, keywords):
+        """
+        Get the query search terms for the selected models and filters
+
+        Parameters:
+            models ([(string, [int])]): Selected models from get_models
+            filters ([Filter]): Selected filters from get_filters
+            keywords (string): Cleaned search keywords
+
+        Returns:
+            [string]: List of query strings
+        """
+        queries = [self.query] if self.query else []
+        queries.extend([query for query, aspect_ids in models if query])
+        query_dict = {}
+        for each_filter in filters:
+            if each_filter.query:
+                query_dict.setdefault(each_filter.group_id, []).append(each_filter.query)
+        for query in list(query_dict.values()):
+            queries.append('(%s)' % ','.join(query) if len(query) > 1 else query[0])
+        if keywords:
+            queries.append(keywords)
+        return queries
+
+    def get_aspects(self, models, filters, strict):
+        """
+        Get the aspectFilter entries for the product, selected models and
+        selected filters
+
+        Parameters:
+            models ([(string, [int])]): Selected models from get_models
+            filters ([Filter]): Selected filters from get_filters
+            strict (bool): Whether unspecified aspect values are excluded
+
+        Returns:
+            [dict]: List of aspectFilter entries
+        """
+        ids = set(self.base_aspects)
+        for query, aspect_ids in models:
+            ids.update(aspect_ids)
+        for each_filter in filters:
+            ids.update(self.filter_aspects[each_filter.id])
+        return [
+            self.aspects[aspect_id][0 if strict else 1]
+            for aspect_id in sorted(ids, key=self.aspect_order.get)
+        ]
+
+def get_index(product):
+    """
+    Get the refinement index of a product, building it when it is missing,
+    older than the current refinements version or older than
+    REFINEMENT_INDEX_TTL
+
+    Parameters:
+        product (Product): Product object
+
+    Returns:
+        RefinementIndex: Index of the product's refinements
+    """
+    version = get_version('refinements')
+    index = indexes.get(product.id)
+    if (
+        index is None or index.version != version or
+        time.time() - index.built > dj_settings.REFINEMENT_INDEX_TTL
+    ):
+        index = RefinementIndex(product, version)
+        with indexes_lock:
+            indexes[product.id] = index
+    return index
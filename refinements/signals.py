@@ -0,0 +1,19 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from core.versions import bump_version
+from products.models import Product
+
+from .models import Aspect, Filter, Group
+
+def invalidate_refinements(**kwargs):
+    """
+    Mark every refinement index as outdated after a catalog edit
+    """
+    bump_version('refinements')
+
+for model in [Product, Filter, Aspect, Group]:
+    post_save.connect(invalidate_refinements, sender=model)
+    post_delete.connect(invalidate_refinements, sender=model)
+
+for through in [Product.aspects.through, Product.filters.through, Filter.aspects.through]:
+    m2m_changed.connect(invalidate_refinements, sender=through)